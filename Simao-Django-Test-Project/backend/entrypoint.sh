@@ -0,0 +1,21 @@
+#!/bin/sh
+
+# Production entrypoint: apply migrations, collect static files, then hand the process over to
+# gunicorn (preforked WSGI workers, or uvicorn workers with APP_SERVER=asgi).
+
+set -e
+
+python manage.py migrate --noinput
+python manage.py createcachetable
+# Refresh the shared static volume (the copy baked into the image only seeds it once)
+python manage.py collectstatic --noinput
+
+# Workers write metrics to per-process files here; start from an empty directory
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+if [ "${APP_SERVER:-wsgi}" = "asgi" ]; then
+    exec gunicorn -c gunicorn.conf.py taskmanager.asgi:application
+fi
+exec gunicorn -c gunicorn.conf.py taskmanager.wsgi:application
@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for the production backend (see entrypoint.sh).
+
+Every value can be overridden from the environment:
+
+    WEB_CONCURRENCY       worker processes (default: 2 x CPU cores + 1)
+    GUNICORN_THREADS      threads per worker (default: 1)
+    GUNICORN_MAX_REQUESTS recycle a worker after this many requests (default: 1000)
+    GUNICORN_TIMEOUT      seconds before a silent worker is killed (default: 30)
+    APP_SERVER            "wsgi" (default) or "asgi" to run uvicorn workers
+    PROMETHEUS_MULTIPROC_DIR  per-worker metrics files, merged by /metrics
+
+Graceful reload: ``kill -HUP <master pid>`` starts fresh workers and lets
+the old ones finish their in-flight requests. Because the app is preloaded
+in the master, deploying new code needs a new master: send USR2 (start a
+new master next to the old one), then WINCH and QUIT to the old master.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Import Django once in the master and fork workers from it: faster boots
+# and copy-on-write sharing of the loaded code.
+preload_app = True
+
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+if os.getenv('APP_SERVER', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Recycle workers periodically (jittered so they don't all restart at once)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (in-flight requests) from /metrics
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,250 @@
+"""
+Two-level cache: a small per-process LRU (L1) in front of a cache shared by
+every worker (L2, Redis or the database cache; see CACHES in settings).
+
+``cache.get()``/``set()``/``delete()`` work as with any backend. Reads are
+answered from L1 when possible; L1 entries live at most LOCAL_TIMEOUT
+seconds, which bounds how long another worker can keep serving a value
+after it was changed or deleted in L2.
+
+For values that are expensive to compute use ``get_or_compute()``:
+
+    cache.get_or_compute('tasks:stats', compute_stats, timeout=60)
+
+* stale-while-revalidate: after ``timeout`` a value stays usable for
+  another ``stale_timeout`` seconds; one caller refreshes it while everyone
+  else keeps getting the stale copy instead of waiting.
+* single-flight: a lock in L2 (an atomic ``add()``) lets only one process
+  recompute a missing or stale key; on a miss the others wait for its
+  result instead of stampeding the database.
+* TTL jitter: lifetimes are stretched by up to JITTER (a fraction) so keys
+  written together don't all expire together.
+
+Keys used with ``get_or_compute()`` hold an envelope (freshness + value) and
+should only be read through it. Hit/miss counts are exported on /metrics
+and available per process from ``cache.stats()``.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_MISSING = object()
+
+# L1 stores, shared by the per-thread backend instances of one cache alias
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU with per-entry expiry, plus hit/miss counts"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, event):
+        with self.lock:
+            self.counts[event] += 1
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend: per-process LRU in front of the shared OPTIONS['SHARED'] cache
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__(params)
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.jitter = options.get('JITTER', 0.1)
+        self.stale_timeout = options.get('STALE_TIMEOUT', 60)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        with _local_stores_lock:
+            self.local = _local_stores.setdefault(
+                location or 'default', LocalLRU(options.get('LOCAL_MAX_ENTRIES', 1000))
+            )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _jittered(self, timeout):
+        return timeout * (1 + random.uniform(0, self.jitter))
+
+    def _local_timeout(self, timeout):
+        return self.local_timeout if timeout is None else min(self.local_timeout, timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not _MISSING:
+            self.local.count('local_hits')
+            metrics.CACHE_REQUESTS.labels('hit').inc()
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.local.count('misses')
+            metrics.CACHE_REQUESTS.labels('miss').inc()
+            return default
+        self.local.count('shared_hits')
+        metrics.CACHE_REQUESTS.labels('hit').inc()
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if timeout:
+            timeout = self._jittered(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        local_key = self.make_and_validate_key(key, version=version)
+        if timeout is not None and timeout <= 0:
+            self.local.delete(local_key)
+        else:
+            self.local.set(local_key, value, self._local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and (timeout is None or timeout > 0):
+            self.local.set(
+                self.make_and_validate_key(key, version=version), value, self._local_timeout(timeout)
+            )
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        return self.local.get(local_key) is not _MISSING or self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # Counters are only consistent in L2
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def get_or_compute(self, key, compute, timeout=DEFAULT_TIMEOUT, stale_timeout=None,
+                       lock_timeout=None, version=None):
+        """
+        Return the cached value of ``key``, calling ``compute()`` (in at most
+        one process at a time) when it is missing or stale
+        """
+        timeout = self._timeout(timeout)
+        stale_timeout = self.stale_timeout if stale_timeout is None else stale_timeout
+        lock_timeout = lock_timeout or self.lock_timeout
+        refresh = (key, compute, timeout, stale_timeout, version)
+
+        envelope = self.get(key, version=version)
+        if envelope is not None:
+            if time.time() < envelope[0]:
+                self.local.count('fresh')
+                return envelope[1]
+            # L1 may just be behind L2
+            latest = self._shared_fresh(key, timeout, version)
+            if latest is not None:
+                return latest[1]
+            # Stale: one caller refreshes, everyone else keeps the old value
+            if not self._acquire(key, lock_timeout, version):
+                self.local.count('stale')
+                metrics.CACHE_STALE_HITS.inc()
+                return envelope[1]
+            return self._recompute(*refresh)
+
+        delay = 0.01
+        deadline = time.monotonic() + lock_timeout
+        while not self._acquire(key, lock_timeout, version):
+            # Someone else is computing it: wait for their result
+            self.local.count('lock_waits')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            envelope = self._shared_fresh(key, timeout, version)
+            if envelope is not None:
+                return envelope[1]
+            if time.monotonic() >= deadline:
+                break
+        return self._recompute(*refresh)
+
+    def _acquire(self, key, lock_timeout, version):
+        return self.shared.add(f'{key}:lock', uuid.uuid4().hex, lock_timeout, version=version)
+
+    def _shared_fresh(self, key, timeout, version):
+        """A fresh envelope from L2 (copied into L1), or None"""
+        envelope = self.shared.get(key, version=version)
+        if envelope is None or time.time() >= envelope[0]:
+            return None
+        self.local.set(
+            self.make_and_validate_key(key, version=version), envelope, self._local_timeout(timeout)
+        )
+        return envelope
+
+    def _recompute(self, key, compute, timeout, stale_timeout, version):
+        try:
+            # Another process may have refreshed it since our L1 copy was read
+            envelope = self._shared_fresh(key, timeout, version)
+            if envelope is not None:
+                return envelope[1]
+            self.local.count('recomputes')
+            metrics.CACHE_RECOMPUTATIONS.inc()
+            value = compute()
+            if timeout is None:
+                envelope, l2_timeout = (float('inf'), value), None
+            else:
+                fresh_for = self._jittered(timeout)
+                envelope, l2_timeout = (time.time() + fresh_for, value), fresh_for + stale_timeout
+            self.set(key, envelope, l2_timeout, version=version)
+            return value
+        finally:
+            self.shared.delete(f'{key}:lock', version=version)
+
+    def stats(self):
+        """This process's counts: local_hits, shared_hits, misses, fresh, stale, recomputes, lock_waits"""
+        with self.local.lock:
+            return dict(self.local.counts)
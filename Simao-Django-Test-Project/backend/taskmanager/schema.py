@@ -0,0 +1,61 @@
+"""
+Serve the OpenAPI schema from a prebuilt file instead of rebuilding it per request.
+
+The files are generated once at image build (see the Dockerfile)::
+
+    python manage.py spectacular --file openapi/schema.yaml
+    python manage.py spectacular --format openapi-json --file openapi/schema.json
+
+In development (OPENAPI_SCHEMA_PREBUILT off) the schema is generated
+in-process on first use instead; runserver's autoreloader restarts the
+process on code changes, so it is regenerated after every edit.
+"""
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_GET
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+FORMATS = {
+    'yaml': ('schema.yaml', OpenApiYamlRenderer, 'application/vnd.oai.openapi; charset=utf-8'),
+    'json': ('schema.json', OpenApiJsonRenderer, 'application/vnd.oai.openapi+json; charset=utf-8'),
+}
+
+
+@lru_cache(maxsize=None)
+def get_schema(fmt):
+    """Return (content, etag) for a schema format, loaded once per process"""
+    filename, renderer_class, _ = FORMATS[fmt]
+    path = settings.OPENAPI_SCHEMA_DIR / filename
+    if settings.OPENAPI_SCHEMA_PREBUILT and path.exists():
+        content = path.read_bytes()
+    else:
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        content = renderer_class().render(schema, renderer_context={})
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def get_format(request):
+    fmt = request.GET.get('format')
+    if fmt in FORMATS:
+        return fmt
+    accept = request.headers.get('Accept', '')
+    return 'json' if 'json' in accept and 'yaml' not in accept else 'yaml'
+
+
+@require_GET
+@condition(etag_func=lambda request: get_schema(get_format(request))[1])
+def schema_view(request):
+    """
+    OpenAPI schema as YAML (default) or JSON (?format=json or Accept: application/json)
+    """
+    fmt = get_format(request)
+    content, _ = get_schema(fmt)
+    response = HttpResponse(content, content_type=FORMATS[fmt][2])
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    patch_vary_headers(response, ['Accept'])
+    return response
@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'taskmanager.health.HealthCheckMiddleware',  # /healthz and /readyz, ahead of everything else
+    'taskmanager.metrics.MetricsMiddleware',  # Prometheus metrics, scraped from /metrics
+    'taskmanager.profiling.ProfilingMiddleware',  # On-demand request profiles (off unless configured)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
@@ -94,6 +97,9 @@ if os.getenv('DB_ENGINE'):
             'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
             'HOST': os.getenv('DB_HOST', 'db'),  # 'db' is the service name in docker-compose
             'PORT': os.getenv('DB_PORT', '5432'),
+            # Reuse connections across requests in long-lived gunicorn workers
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 else:
@@ -105,6 +111,62 @@ else:
         }
     }
 
+# Task sharding
+# Tasks are partitioned by user across TASK_SHARDS (see tasks/sharding.py);
+# auth and every other table stay on 'default'. TASK_SHARD_COUNT extra
+# databases named shard_1..shard_N are added next to 'default': separate
+# SQLite files locally, or <DB_NAME>_shard_<n> on PostgreSQL, optionally on
+# the hosts listed in TASK_SHARD_HOSTS (comma separated).
+TASK_SHARD_COUNT = int(os.getenv('TASK_SHARD_COUNT', '0'))
+TASK_SHARD_HOSTS = [host for host in os.getenv('TASK_SHARD_HOSTS', '').split(',') if host]
+for shard in range(1, TASK_SHARD_COUNT + 1):
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[f'shard_{shard}'] = {
+            **DATABASES['default'],
+            'NAME': BASE_DIR / f'db_shard_{shard}.sqlite3',
+        }
+    else:
+        DATABASES[f'shard_{shard}'] = {
+            **DATABASES['default'],
+            'NAME': f"{DATABASES['default']['NAME']}_shard_{shard}",
+        }
+        if TASK_SHARD_HOSTS:
+            DATABASES[f'shard_{shard}']['HOST'] = TASK_SHARD_HOSTS[(shard - 1) % len(TASK_SHARD_HOSTS)]
+
+TASK_SHARDS = ['default'] + [f'shard_{shard}' for shard in range(1, TASK_SHARD_COUNT + 1)]
+TASK_SHARD_CACHE_TIMEOUT = 300
+DATABASE_ROUTERS = ['tasks.routers.TaskShardRouter']
+
+# Two-level cache (see taskmanager/cache.py): a per-process LRU in front of
+# a cache every worker shares. The shared level is Redis when REDIS_URL is
+# set, otherwise the database cache table (created by `createcachetable`).
+if os.getenv('REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'taskmanager.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,    # seconds another worker may serve a changed value
+            'JITTER': 0.1,         # stretch TTLs by up to 10%
+            'STALE_TIMEOUT': 60,   # get_or_compute(): serve stale this long while refreshing
+            'LOCK_TIMEOUT': 10,    # get_or_compute(): single-flight lock lifetime
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -141,6 +203,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+# Collected into the volume nginx serves /static/ from (see nginx/nginx.conf)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Content-hashed file names plus precompressed .gz/.br copies
+    'staticfiles': {
+        'BACKEND': 'taskmanager.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
@@ -155,11 +229,49 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # MessagePack is negotiated alongside JSON for high-volume service clients
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+        'tasks.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'tasks.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'TEST_REQUEST_RENDERER_CLASSES': (
+        'rest_framework.renderers.MultiPartRenderer',
+        'rest_framework.renderers.JSONRenderer',
+        'tasks.renderers.MessagePackRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# How long /readyz reuses its last database check, in seconds
+READINESS_CACHE_SECONDS = 5
+
+# Lifetime of cached task list/calendar reads; task writes invalidate them
+# immediately (see tasks/caching.py)
+TASK_CACHE_TIMEOUT = 300
+
+# Recurring tasks: occurrences are materialized this many days ahead
+# (see tasks/recurrence.py and the materialize_recurring_tasks command)
+TASK_RECURRENCE_WINDOW_DAYS = 14
+TASK_RECURRENCE_BATCH_SIZE = 500
+
+# Longest date range accepted by GET /api/tasks/calendar/
+TASK_CALENDAR_MAX_DAYS = 92
+
+# Longest date range accepted by GET /api/tasks/activity/
+TASK_ACTIVITY_MAX_DAYS = 366
+
+# Maximum number of sub-requests accepted by POST /api/batch/
+BATCH_MAX_REQUESTS = 20
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -182,7 +294,11 @@ CORS_ALLOW_CREDENTIALS = True
 # API Documentation with drf-spectacular (Swagger/OpenAPI)
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Task Manager API',
-    'DESCRIPTION': 'RESTful API for Task Management Application with JWT Authentication',
+    'DESCRIPTION': (
+        'RESTful API for Task Management Application with JWT Authentication. '
+        'Every endpoint accepts and returns `application/json` or `application/msgpack`, '
+        'selected with the `Content-Type` and `Accept` headers.'
+    ),
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
     'COMPONENT_SPLIT_REQUEST': True,
@@ -195,3 +311,20 @@ SPECTACULAR_SETTINGS = {
     'SWAGGER_UI_DIST': '//unpkg.com/swagger-ui-dist@5.1.0',
     'SWAGGER_UI_FAVICON_HREF': '//unpkg.com/swagger-ui-dist@5.1.0/favicon-32x32.png',
 }
+
+# Prebuilt OpenAPI schema served at /api/schema/ (see taskmanager/schema.py).
+# The Dockerfile writes it to OPENAPI_SCHEMA_DIR at build time; with
+# OPENAPI_SCHEMA_PREBUILT off (the default while DEBUG is on) it is
+# generated in-process instead and follows code changes.
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+OPENAPI_SCHEMA_PREBUILT = os.getenv('OPENAPI_SCHEMA_PREBUILT', '0' if DEBUG else '1') == '1'
+OPENAPI_SCHEMA_MAX_AGE = 60 * 60 * 24
+
+# On-demand request profiling (see taskmanager/profiling.py). Requests are
+# profiled when sent with "X-Profile: <PROFILING_TOKEN>" or picked by
+# PROFILING_SAMPLE_RATE (0.01 = 1% of requests); with neither set the
+# middleware is disabled.
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = 0.005
@@ -0,0 +1,70 @@
+"""
+collectstatic storage that writes content-hashed, precompressed files.
+
+Every collected file gets a hashed copy (``base.1a2b3c4d5e6f.css``) plus
+``.gz`` and, when the ``brotli`` package is installed, ``.br`` siblings, so
+nginx can serve them straight from STATIC_ROOT with ``gzip_static`` /
+``brotli_static`` and cache hashed names forever.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # .br files are skipped without the brotli package
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot',
+)
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also precompresses text assets
+    """
+
+    def url(self, name, force=False):
+        # Hashed names whenever collectstatic has written a manifest, even
+        # with DEBUG on, since nginx serves STATIC_ROOT directly.
+        return super().url(name, force=force or bool(self.hashed_files))
+
+    def stored_name(self, name):
+        # Without a manifest (collectstatic not run, e.g. local tests) fall
+        # back to the plain name instead of failing every {% static %} tag.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        """Write .gz/.br next to ``name`` unless they exist or don't save space"""
+        path = self.path(name)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        encoders = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, encode in encoders:
+            target = path + suffix
+            # Rewrite when the source changed (unhashed names keep their name)
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            compressed = encode(content)
+            if len(compressed) < len(content):
+                with open(target, 'wb') as f:
+                    f.write(compressed)
@@ -0,0 +1,100 @@
+"""
+Task activity history.
+
+Every task creation, status change and deletion made through the API or the
+admin is appended to TaskEvent, and in the same transaction the owner's
+TaskActivityDay row for that day and transition is incremented. History
+(GET /api/tasks/activity/) reads only the rollups: at most a dozen rows per
+user and day, however many events there are.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TaskActivityDay, TaskEvent
+
+STATUS_BY_CODE = {code: value for value, code in TaskEvent.STATUS_CODES.items()}
+
+
+def status_code(task_status):
+    """The stored code of ``task_status`` (None: no status)"""
+    return TaskEvent.NO_STATUS if task_status is None else TaskEvent.STATUS_CODES[task_status]
+
+
+def record(changes, source):
+    """
+    Log ``changes``, (task, from_status, to_status) triples where None means
+    before creation / after deletion, and update the daily rollups. Call it
+    before deleting a task, while it still has its primary key.
+    """
+    now = timezone.now()
+    day = timezone.localdate(now)
+    by_db = {}
+    for task, from_status, to_status in changes:
+        if from_status == to_status:
+            continue
+        by_db.setdefault(task._state.db, []).append(TaskEvent(
+            user_id=task.user_id,
+            task_id=task.pk,
+            from_status=status_code(from_status),
+            to_status=status_code(to_status),
+            source=source,
+            occurred_at=now,
+        ))
+
+    for db, events in by_db.items():
+        counts = Counter((event.user_id, event.from_status, event.to_status) for event in events)
+        with transaction.atomic(using=db):
+            TaskEvent.objects.using(db).bulk_create(events)
+            for (user_id, from_status, to_status), count in counts.items():
+                _increment(db, user_id, day, from_status, to_status, count)
+
+
+def _increment(db, user_id, day, from_status, to_status, count):
+    rollup = TaskActivityDay.objects.using(db).filter(
+        user_id=user_id, day=day, from_status=from_status, to_status=to_status
+    )
+    if rollup.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic(using=db):
+            TaskActivityDay.objects.using(db).create(
+                user_id=user_id, day=day, from_status=from_status, to_status=to_status, count=count
+            )
+    except IntegrityError:
+        # Another request created the row since our update
+        rollup.update(count=F('count') + count)
+
+
+def history(user, start, end):
+    """
+    ``user``'s activity per day from ``start`` to ``end`` (inclusive), from
+    the rollups. Days without activity are left out.
+    """
+    rows = (
+        TaskActivityDay.objects.for_user(user)
+        .filter(day__gte=start, day__lte=end)
+        .order_by('day', 'from_status', 'to_status')
+        .values_list('day', 'from_status', 'to_status', 'count')
+    )
+    completed = TaskEvent.STATUS_CODES['completed']
+    days = []
+    for day, from_status, to_status, count in rows:
+        if not days or days[-1]['date'] != day:
+            days.append({'date': day, 'created': 0, 'completed': 0, 'deleted': 0, 'transitions': []})
+        bucket = days[-1]
+        if from_status == TaskEvent.NO_STATUS:
+            bucket['created'] += count
+        elif to_status == TaskEvent.NO_STATUS:
+            bucket['deleted'] += count
+        else:
+            bucket['transitions'].append({
+                'from_status': STATUS_BY_CODE[from_status],
+                'to_status': STATUS_BY_CODE[to_status],
+                'count': count,
+            })
+        if to_status == completed:
+            bucket['completed'] += count
+    return days
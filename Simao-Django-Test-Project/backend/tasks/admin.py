@@ -1,12 +1,16 @@
 from django.contrib import admin
-from .models import Task
+from . import activity
+from .changelist import ScalableAdminMixin
+from .models import RecurrenceRule, Task, TaskEvent
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'user', 'status', 'due_date', 'created_at')
     list_filter = ('status', 'due_date', 'created_at')
-    search_fields = ('title', 'description', 'user__username')
+    list_select_related = ('user',)
+    # title/description are trigram-indexed on PostgreSQL; usernames match exactly
+    search_fields = ('title', 'description', 'user__username__exact')
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
@@ -21,3 +25,29 @@ class TaskAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    # Record creations, status changes and deletions in the activity log
+    def save_model(self, request, obj, form, change):
+        previous_status = form.initial.get('status') if change else None
+        super().save_model(request, obj, form, change)
+        activity.record([(obj, previous_status, obj.status)], TaskEvent.SOURCE_ADMIN)
+    
+    def delete_model(self, request, obj):
+        activity.record([(obj, obj.status, None)], TaskEvent.SOURCE_ADMIN)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        activity.record(
+            [(task, task.status, None) for task in queryset.only('id', 'user_id', 'status')],
+            TaskEvent.SOURCE_ADMIN,
+        )
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'frequency', 'interval', 'start_date', 'end_date', 'materialized_through')
+    list_filter = ('frequency',)
+    list_select_related = ('user',)
+    search_fields = ('title', 'user__username__exact')
+    readonly_fields = ('materialized_through', 'created_at', 'updated_at')
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
 
 
 class TasksConfig(AppConfig):
     name = 'tasks'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from .caching import on_task_change
+        from .models import Task
+        from .sharding import on_post_migrate, on_user_delete
+
+        post_migrate.connect(on_post_migrate, sender=self)
+        pre_delete.connect(on_user_delete, sender=User)
+        # Drop cached task reads whenever a task changes
+        post_save.connect(on_task_change, sender=Task)
+        post_delete.connect(on_task_change, sender=Task)
@@ -0,0 +1,52 @@
+"""
+Cached task read paths (the task list and calendar).
+
+Cached responses are keyed by a per-user generation token kept in the
+shared cache level. Every task write replaces the token (see the signal
+handlers connected in apps.py), so a user never reads their own tasks from
+before a change, on any worker, and old entries simply age out.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+GENERATION_KEY = 'task-generation:{}'
+
+
+def shared_cache():
+    # Generations must not be served from a worker's local level
+    return caches['shared']
+
+
+def task_generation(user_id):
+    """The current cache generation of ``user_id``'s tasks"""
+    key = GENERATION_KEY.format(user_id)
+    generation = shared_cache().get(key)
+    if generation is None:
+        shared_cache().add(key, uuid.uuid4().hex, None)
+        generation = shared_cache().get(key)
+    return generation
+
+
+def invalidate_tasks(*user_ids):
+    """Start a new cache generation for each of ``user_ids``"""
+    shared_cache().set_many(
+        {GENERATION_KEY.format(user_id): uuid.uuid4().hex for user_id in set(user_ids)}, None
+    )
+
+
+def cached_task_read(user_id, name, params, compute):
+    """
+    ``compute()`` cached for the user's current task generation; ``params``
+    must identify everything else the result depends on
+    """
+    digest = hashlib.md5(params.encode()).hexdigest()
+    key = f'tasks:{user_id}:{task_generation(user_id)}:{name}:{digest}'
+    # A generation never changes, so its entries are never stale
+    return cache.get_or_compute(key, compute, timeout=settings.TASK_CACHE_TIMEOUT, stale_timeout=0)
+
+
+def on_task_change(sender, instance, raw=False, **kwargs):
+    invalidate_tasks(instance.user_id)
@@ -0,0 +1,71 @@
+import time
+from io import BytesIO
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from tasks.models import Task
+from tasks.parsers import MessagePackParser
+from tasks.renderers import MessagePackRenderer
+from tasks.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare JSON and MessagePack payload size and encode/decode time for task pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100, help='Tasks per payload (default: 100)')
+        parser.add_argument('--rounds', type=int, default=1000, help='Encode/decode rounds (default: 1000)')
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options['tasks'])
+        rounds = options['rounds']
+
+        formats = [
+            ('json', JSONRenderer(), JSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        ]
+        self.stdout.write(f"{options['tasks']} tasks per payload, {rounds} rounds")
+        self.stdout.write(f"{'format':<10}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+        for name, renderer, parser in formats:
+            body = renderer.render(payload)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                renderer.render(payload)
+            encode = (time.perf_counter() - start) / rounds * 1e6
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                parser.parse(BytesIO(body))
+            decode = (time.perf_counter() - start) / rounds * 1e6
+
+            self.stdout.write(f'{name:<10}{len(body):>10}{encode:>12.1f}{decode:>12.1f}')
+
+    def build_payload(self, count):
+        """Serialize unsaved tasks the same way a TaskViewSet list page does"""
+        user = User(username='benchmark')
+        now = timezone.now()
+        tasks = [
+            Task(
+                id=i,
+                user=user,
+                title=f'Benchmark task {i}',
+                description='Prepare the weekly report and share it with the team.',
+                status='pending',
+                due_date=date.today() + timedelta(days=i % 30),
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(1, count + 1)
+        ]
+        return {
+            'count': count,
+            'next': None,
+            'previous': None,
+            'results': TaskSerializer(tasks, many=True).data,
+        }
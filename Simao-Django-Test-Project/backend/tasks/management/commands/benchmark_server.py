@@ -0,0 +1,96 @@
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = {
+    'runserver': lambda port: [
+        sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}',
+    ],
+    'gunicorn': lambda port: [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+        '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null',
+        'taskmanager.wsgi:application',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and latency of runserver and the gunicorn production server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/readyz', help='Path to request (default: /readyz)')
+        parser.add_argument('--header', action='append', default=[],
+                            help='Extra request header, e.g. "Authorization: Bearer <token>"')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients (default: 16)')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per server (default: 2000)')
+        parser.add_argument('--port', type=int, default=8765, help='Port to run the servers on')
+        parser.add_argument('--server', choices=SERVERS, action='append',
+                            help='Only benchmark the given server(s)')
+
+    def handle(self, *args, **options):
+        headers = {
+            name.strip(): value.strip()
+            for name, value in (header.split(':', 1) for header in options['header'])
+        }
+        url = f"http://127.0.0.1:{options['port']}{options['path']}"
+
+        self.stdout.write(
+            f"{options['requests']} requests to {options['path']}, concurrency {options['concurrency']}"
+        )
+        self.stdout.write(f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name in options['server'] or SERVERS:
+            process = subprocess.Popen(
+                SERVERS[name](options['port']),
+                cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                self.wait_until_up(f"http://127.0.0.1:{options['port']}/healthz")
+                rate, latencies, errors = self.run_load(
+                    url, headers, options['requests'], options['concurrency']
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{name:<12}{rate:>10.0f}{quantiles[49] * 1000:>10.1f}'
+                f'{quantiles[98] * 1000:>10.1f}{errors:>8}'
+            )
+
+    def wait_until_up(self, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(url, timeout=1).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Server did not come up at {url}')
+
+    def run_load(self, url, headers, total, concurrency):
+        def fetch(_):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=10) as r:
+                    r.read()
+                ok = True
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        return total / elapsed, latencies, errors
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from tasks.models import RecurrenceRule
+from tasks.recurrence import materialize, window_end
+from tasks.sharding import get_shards
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming occurrences of recurring tasks (run daily, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rules loaded and materialized per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        through = window_end(today)
+        for alias in get_shards():
+            # Only rules whose window is behind and that haven't ended
+            pending = (
+                RecurrenceRule.objects.using(alias)
+                .filter(Q(materialized_through__isnull=True) | Q(materialized_through__lt=through))
+                .exclude(end_date__lt=today)
+                .order_by('pk')
+            )
+            rules = tasks = 0
+            last_pk = 0
+            # Keyset pagination: each chunk is its own short query and transaction
+            while chunk := list(pending.filter(pk__gt=last_pk)[:options['chunk_size']]):
+                tasks += materialize(chunk, through=through, today=today)
+                rules += len(chunk)
+                last_pk = chunk[-1].pk
+            self.stdout.write(f'{alias}: {rules} rules, {tasks} occurrences through {through}')
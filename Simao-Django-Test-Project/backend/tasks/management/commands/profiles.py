@@ -0,0 +1,65 @@
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmanager.profiling import load_profiles, read_stacks
+
+
+class Command(BaseCommand):
+    help = 'List captured request profiles, or summarize where the time went in some of them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Profiles to summarize (merged); lists profiles if omitted')
+        parser.add_argument('--view', help='Only list profiles of this view, e.g. TaskViewSet.list')
+        parser.add_argument('--limit', type=int, default=20, help='Profiles to list (default: 20)')
+        parser.add_argument('--top', type=int, default=15, help='Functions to show in a summary (default: 15)')
+
+    def handle(self, *args, **options):
+        if options['names']:
+            self.summarize(options['names'], options['top'])
+        else:
+            self.list_profiles(options['view'], options['limit'])
+
+    def list_profiles(self, view, limit):
+        profiles = [profile for profile in load_profiles() if not view or profile['view'] == view]
+        if not profiles:
+            self.stdout.write('No profiles captured')
+            return
+        self.stdout.write(f"{'started':<20}{'method':<8}{'status':>7}{'ms':>9}{'samples':>9}  name")
+        for profile in profiles[:limit]:
+            started = datetime.fromtimestamp(profile['started_at']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{started:<20}{profile['method']:<8}{profile['status']:>7}"
+                f"{profile['duration'] * 1000:>9.1f}{profile['samples']:>9}  {profile['name']}"
+            )
+        if len(profiles) > limit:
+            self.stdout.write(f'... {len(profiles) - limit} more (use --limit)')
+
+    def summarize(self, names, top):
+        stacks = Counter()
+        for name in names:
+            try:
+                stacks.update(read_stacks(name))
+            except FileNotFoundError:
+                raise CommandError(f'No profile named {name}')
+        total = sum(stacks.values())
+        if not total:
+            self.stdout.write('No samples (the requests finished within one sampling interval)')
+            return
+
+        # Self time: the innermost frame. Total time: every function on the
+        # stack, counted once per sample even when it recurses.
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        self.stdout.write(f'{total} samples from {len(names)} profile(s)')
+        for title, counter in (('Self', own), ('Total', inclusive)):
+            self.stdout.write(f'\n{title:>6}  function')
+            for frame, count in counter.most_common(top):
+                self.stdout.write(f'{count / total:>6.1%}  {frame}')
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from tasks.models import RecurrenceRule, Task, TaskActivityDay, TaskEvent, UserShard
+from tasks.sharding import assign_shard, get_shards, shard_for_user
+
+
+def move_user(user_id, target):
+    """
+    Copy a user's recurrence rules, tasks and activity to ``target``,
+    repoint the shard map, then delete the originals. Primary keys and timestamps are preserved (raw saves, as
+    loaddata does); a crash before the final delete only leaves unreachable
+    copies on the source shard.
+    """
+    source = shard_for_user(user_id)
+    if source == target:
+        return 0
+    # Rules first: occurrences reference them
+    models = (RecurrenceRule, Task, TaskEvent, TaskActivityDay)
+    rows = {model: list(model.objects.using(source).filter(user_id=user_id)) for model in models}
+    with transaction.atomic(using=target):
+        for model in models:
+            for row in rows[model]:
+                row.save_base(raw=True, using=target, force_insert=True)
+    assign_shard(user_id, target)
+    for model in reversed(models):
+        model.objects.using(source).filter(user_id=user_id).delete()
+    return len(rows[Task])
+
+
+class Command(BaseCommand):
+    help = 'Move users (and their tasks) between task database shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='User id to move (repeatable); requires --to')
+        parser.add_argument('--to', dest='target', help='Target shard alias for --user')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only print the moves an automatic rebalance would make')
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if len(shards) < 2:
+            raise CommandError('Sharding is not enabled (set TASK_SHARD_COUNT).')
+
+        if options['users']:
+            if options['target'] not in shards:
+                raise CommandError(f"--to must be one of: {', '.join(shards)}")
+            moves = [(user_id, options['target']) for user_id in options['users']]
+        else:
+            moves = self.plan_rebalance(shards)
+
+        for user_id, target in moves:
+            if options['dry_run']:
+                self.stdout.write(f'Would move user {user_id} -> {target}')
+                continue
+            moved = move_user(user_id, target)
+            self.stdout.write(self.style.SUCCESS(f'Moved user {user_id} -> {target} ({moved} tasks)'))
+        if not moves:
+            self.stdout.write('Shards are already balanced.')
+
+    def plan_rebalance(self, shards):
+        """
+        Greedily move users from the fullest shard to the emptiest one while
+        that narrows the gap between them.
+        """
+        loads = {}
+        users = {}
+        for alias in shards:
+            counts = dict(
+                Task.objects.using(alias)
+                .order_by()
+                .values_list('user_id')
+                .annotate(total=Count('id'))
+            )
+            # Only count users the shard map actually routes here
+            mapped = set(
+                UserShard.objects.filter(alias=alias, user_id__in=counts).values_list('user_id', flat=True)
+            )
+            users[alias] = {user_id: total for user_id, total in counts.items() if user_id in mapped}
+            loads[alias] = sum(users[alias].values())
+
+        moves = []
+        while True:
+            fullest = max(shards, key=loads.get)
+            emptiest = min(shards, key=loads.get)
+            gap = loads[fullest] - loads[emptiest]
+            candidates = [
+                (total, user_id) for user_id, total in users[fullest].items() if 0 < total < gap
+            ]
+            if not candidates:
+                return moves
+            # The user whose move leaves the two shards closest to even
+            total, user_id = min(candidates, key=lambda c: abs(gap - 2 * c[0]))
+            if abs(gap - 2 * total) >= gap:
+                return moves
+            del users[fullest][user_id]
+            users[emptiest][user_id] = total
+            loads[fullest] -= total
+            loads[emptiest] += total
+            moves.append((user_id, emptiest))
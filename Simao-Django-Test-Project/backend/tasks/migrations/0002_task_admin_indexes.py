@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+TRIGRAM_INDEXES = {
+    'tasks_task_title_trgm': 'title',
+    'tasks_task_description_trgm': 'description',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Back the admin's ILIKE '%q%' search with pg_trgm GIN indexes (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON tasks_task USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at'], name='tasks_task_created_5da2cb_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_user_shards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date', 'id', 'status', 'title'], name='tasks_task_calendar_idx'),
+        ),
+    ]
@@ -1,5 +1,25 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .sharding import shard_for_user
+
+
+class TaskManager(models.Manager):
+    """
+    Manager for per-user models stored on their owner's shard (Task,
+    RecurrenceRule and the activity tables)
+    """
+    def for_user(self, user):
+        """Rows owned by ``user``, read from the shard that holds them"""
+        return self.using(shard_for_user(user.pk)).filter(user=user)
+    
+    def create(self, **kwargs):
+        """Create the row on its owner's shard unless a database was chosen"""
+        user_id = kwargs['user'].pk if kwargs.get('user') is not None else kwargs.get('user_id')
+        if self._db is None and user_id is not None:
+            return self.db_manager(shard_for_user(user_id)).create(**kwargs)
+        return super().create(**kwargs)
 
 
 class Task(models.Model):
@@ -12,16 +32,169 @@ class Task(models.Model):
         ('completed', 'Completed'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
+    # No FK constraint: tasks may live on a different database shard than auth_user
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='tasks', db_constraint=False
+    )
     title = models.CharField(max_length=200)
     description = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     due_date = models.DateField()
+    # Set on occurrences materialized from a recurrence rule
+    recurrence = models.ForeignKey(
+        'RecurrenceRule', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TaskManager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            # The task list: one user's tasks, newest first
+            models.Index(fields=['user', '-created_at'], name='tasks_task_user_created_idx'),
+            # Covers the calendar endpoint's range scan and summary columns
+            models.Index(
+                fields=['user', 'due_date', 'id', 'status', 'title'],
+                name='tasks_task_calendar_idx',
+            ),
+        ]
+        constraints = [
+            # At most one occurrence per rule and day, so materializing is idempotent
+            models.UniqueConstraint(fields=['recurrence', 'due_date'], name='tasks_task_unique_occurrence'),
+        ]
         
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+
+
+class RecurrenceRule(models.Model):
+    """
+    Repeating task template. Occurrences are created as ordinary tasks, only
+    a rolling window ahead (see tasks/recurrence.py).
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+    
+    # Lives on the owner's shard next to their tasks
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='recurrence_rules', db_constraint=False
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Repeat every N days/weeks/months")
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True, help_text="Last possible occurrence (inclusive)")
+    # Occurrences exist up to this date; the periodic job extends it
+    materialized_through = models.DateField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = TaskManager()
+    
+    class Meta:
+        ordering = ['start_date', 'id']
+        indexes = [
+            # Rules the periodic job still has to extend
+            models.Index(fields=['materialized_through'], name='tasks_rule_materialized_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} ({self.get_frequency_display()})"
+
+
+class TaskEvent(models.Model):
+    """
+    Append-only log of task creations, status changes and deletions.
+    
+    Rows are never updated or read for history; the daily TaskActivityDay
+    rollups are (see tasks/activity.py).
+    """
+    # Statuses are stored as small codes; NO_STATUS stands for "before the
+    # task was created" and "after it was deleted"
+    NO_STATUS = 0
+    STATUS_CODES = {'pending': 1, 'in_progress': 2, 'completed': 3}
+    STATUS_CODE_CHOICES = [
+        (NO_STATUS, 'None'),
+        (1, 'Pending'),
+        (2, 'In Progress'),
+        (3, 'Completed'),
+    ]
+    SOURCE_API = 1
+    SOURCE_ADMIN = 2
+    SOURCE_CHOICES = [
+        (SOURCE_API, 'API'),
+        (SOURCE_ADMIN, 'Admin'),
+    ]
+    
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='task_events', db_constraint=False
+    )
+    # Not a foreign key: events outlive the task they describe
+    task_id = models.BigIntegerField()
+    from_status = models.PositiveSmallIntegerField(choices=STATUS_CODE_CHOICES)
+    to_status = models.PositiveSmallIntegerField(choices=STATUS_CODE_CHOICES)
+    source = models.PositiveSmallIntegerField(choices=SOURCE_CHOICES)
+    occurred_at = models.DateTimeField(default=timezone.now)
+    
+    objects = TaskManager()
+    
+    class Meta:
+        indexes = [
+            # A task's own history
+            models.Index(fields=['task_id', 'occurred_at'], name='tasks_event_task_idx'),
+        ]
+    
+    def __str__(self):
+        return (
+            f"Task {self.task_id}: {self.get_from_status_display()} -> "
+            f"{self.get_to_status_display()}"
+        )
+
+
+class TaskActivityDay(models.Model):
+    """
+    Daily per-user count of each status transition, incremented whenever a
+    TaskEvent is recorded. Creations have from_status NO_STATUS and
+    deletions to_status NO_STATUS.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='task_activity', db_constraint=False
+    )
+    day = models.DateField()
+    from_status = models.PositiveSmallIntegerField(choices=TaskEvent.STATUS_CODE_CHOICES)
+    to_status = models.PositiveSmallIntegerField(choices=TaskEvent.STATUS_CODE_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    
+    objects = TaskManager()
+    
+    class Meta:
+        ordering = ['day', 'from_status', 'to_status']
+        constraints = [
+            # Also serves the per-user date range reads
+            models.UniqueConstraint(
+                fields=['user', 'day', 'from_status', 'to_status'], name='tasks_activity_day_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.day}: {self.from_status} -> {self.to_status} x{self.count}"
+
+
+class UserShard(models.Model):
+    """
+    Shard map entry: which database alias holds a user's tasks
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='task_shard'
+    )
+    alias = models.CharField(max_length=100)
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.alias}"
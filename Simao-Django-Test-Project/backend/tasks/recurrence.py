@@ -0,0 +1,121 @@
+"""
+Materialization of recurring tasks.
+
+A RecurrenceRule only turns into concrete Task rows for dates inside a
+rolling window (today .. today + TASK_RECURRENCE_WINDOW_DAYS). New rules
+fill the window when they are created; ``manage.py materialize_recurring_tasks``
+(run daily) moves it forward. Past dates are never backfilled, so the number
+of rows a rule adds is bounded by the window no matter when it started, and
+a unique (recurrence, due_date) constraint makes every run idempotent.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import invalidate_tasks
+from .models import RecurrenceRule, Task
+
+
+def window_end(today=None):
+    """Last date occurrences are created for"""
+    today = today or timezone.localdate()
+    return today + timedelta(days=settings.TASK_RECURRENCE_WINDOW_DAYS)
+
+
+def add_months(day, months):
+    """``day`` moved by ``months``, clamped to the end of shorter months"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(rule, after, through):
+    """
+    Occurrence dates of ``rule`` in (after, through], computed directly from
+    the start date rather than by stepping from it
+    """
+    last = min(through, rule.end_date) if rule.end_date else through
+    start = rule.start_date
+    if rule.frequency == 'monthly':
+        months_since = (after.year - start.year) * 12 + after.month - start.month
+        step = max(0, months_since // rule.interval)
+        while True:
+            day = add_months(start, step * rule.interval)
+            if day > last:
+                return
+            if day > after:
+                yield day
+            step += 1
+    else:
+        every = timedelta(days=rule.interval * (7 if rule.frequency == 'weekly' else 1))
+        step = max(0, (after - start) // every + 1)
+        day = start + step * every
+        while day <= last:
+            yield day
+            day += every
+
+
+def materialize(rules, through=None, today=None):
+    """
+    Create the missing occurrences of ``rules`` up to ``through`` (default:
+    the end of the rolling window) with one bulk insert per database.
+    Returns the number of occurrences generated; ones that already exist are
+    skipped by the unique constraint.
+    """
+    today = today or timezone.localdate()
+    through = through or window_end(today)
+    by_db = {}
+    for rule in rules:
+        by_db.setdefault(rule._state.db, []).append(rule)
+
+    generated = 0
+    for db, db_rules in by_db.items():
+        tasks = []
+        advanced = []
+        for rule in db_rules:
+            # Never backfill days before today
+            after = max(
+                rule.materialized_through or date.min,
+                rule.start_date - timedelta(days=1),
+                today - timedelta(days=1),
+            )
+            if after >= through:
+                continue
+            tasks.extend(
+                Task(
+                    user_id=rule.user_id,
+                    recurrence=rule,
+                    title=rule.title,
+                    description=rule.description,
+                    due_date=day,
+                )
+                for day in occurrence_dates(rule, after, through)
+            )
+            rule.materialized_through = through
+            advanced.append(rule)
+        with transaction.atomic(using=db):
+            Task.objects.using(db).bulk_create(
+                tasks, batch_size=settings.TASK_RECURRENCE_BATCH_SIZE, ignore_conflicts=True
+            )
+            RecurrenceRule.objects.using(db).bulk_update(
+                advanced, ['materialized_through'], batch_size=settings.TASK_RECURRENCE_BATCH_SIZE
+            )
+        generated += len(tasks)
+    # bulk_create() sends no post_save signals
+    invalidate_tasks(*(rule.user_id for rule in rules))
+    return generated
+
+
+def clear_upcoming(rule, today=None):
+    """
+    Delete the rule's untouched (still pending) occurrences from today on and
+    reset its window, e.g. before the schedule changes or the rule is deleted
+    """
+    today = today or timezone.localdate()
+    Task.objects.using(rule._state.db).filter(
+        recurrence=rule, due_date__gte=today, status='pending'
+    ).delete()
+    rule.materialized_through = None
@@ -0,0 +1,38 @@
+import datetime
+
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _encode_default(obj):
+    """
+    Fallback encoder for objects msgpack cannot pack natively.
+
+    Dates and datetimes are written as full-precision ISO 8601 strings (the
+    same form TaskSerializer produces) so a value survives a round trip
+    unchanged. Everything else is handled like DRF's JSON encoder.
+    """
+    if isinstance(obj, datetime.datetime):
+        value = obj.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
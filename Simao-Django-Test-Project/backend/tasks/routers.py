@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import RecurrenceRule, Task, TaskActivityDay, TaskEvent
+from .sharding import shard_for_user
+
+# Per-user models that live on their owner's shard
+SHARDED_MODELS = (Task, RecurrenceRule, TaskEvent, TaskActivityDay)
+
+
+class TaskShardRouter:
+    """
+    Database router that sends Task rows (and recurrence rules and activity)
+    to their owner's shard.
+
+    Every other model (auth, sessions, the shard map itself) stays on the
+    default database.
+    """
+
+    def _shard(self, model, hints):
+        if model not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if isinstance(instance, SHARDED_MODELS) and instance.user_id is not None:
+            return shard_for_user(instance.user_id)
+        if isinstance(instance, User) and instance.pk is not None:
+            return shard_for_user(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Tasks and rules reference their (central) owner across databases
+        if isinstance(obj1, User) and isinstance(obj2, SHARDED_MODELS):
+            return True
+        if isinstance(obj2, User) and isinstance(obj1, SHARDED_MODELS):
+            return True
+        return None
@@ -1,6 +1,10 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Task
+from .models import RecurrenceRule, Task
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -49,8 +53,11 @@ class TaskSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Task
-        fields = ('id', 'user', 'title', 'description', 'status', 'due_date', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'user', 'created_at', 'updated_at')
+        fields = (
+            'id', 'user', 'title', 'description', 'status', 'due_date', 'recurrence',
+            'created_at', 'updated_at'
+        )
+        read_only_fields = ('id', 'user', 'recurrence', 'created_at', 'updated_at')
     
     def validate_status(self, value):
         """Validate status field"""
@@ -59,3 +66,118 @@ class TaskSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Status must be one of: {', '.join(valid_statuses)}")
         return value
 
+
+class RecurrenceRuleSerializer(serializers.ModelSerializer):
+    """Serializer for RecurrenceRule model"""
+    user = serializers.ReadOnlyField(source='user.username')
+    interval = serializers.IntegerField(min_value=1, max_value=365, default=1)
+    
+    class Meta:
+        model = RecurrenceRule
+        fields = (
+            'id', 'user', 'title', 'description', 'frequency', 'interval', 'start_date', 'end_date',
+            'materialized_through', 'created_at', 'updated_at'
+        )
+        read_only_fields = ('id', 'user', 'materialized_through', 'created_at', 'updated_at')
+    
+    def validate(self, attrs):
+        """Ensure the rule does not end before it starts"""
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError("end_date must not be before start_date.")
+        return attrs
+
+
+class CalendarQuerySerializer(serializers.Serializer):
+    """Serializer for calendar range query parameters"""
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Inclusive")
+    per_day = serializers.IntegerField(
+        required=False, default=5, min_value=1, max_value=50,
+        help_text="Maximum tasks listed per day; the rest are counted in 'overflow'"
+    )
+    
+    def validate(self, attrs):
+        """Ensure the range is ordered and not too long"""
+        days = (attrs['end'] - attrs['start']).days + 1
+        if days < 1:
+            raise serializers.ValidationError("end must not be before start.")
+        if days > settings.TASK_CALENDAR_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"The range may span at most {settings.TASK_CALENDAR_MAX_DAYS} days."
+            )
+        return attrs
+
+
+class CalendarTaskSerializer(serializers.Serializer):
+    """Compact task summary used in calendar buckets"""
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    status = serializers.CharField()
+
+
+class CalendarDaySerializer(serializers.Serializer):
+    """Tasks due on one calendar day"""
+    date = serializers.DateField()
+    tasks = CalendarTaskSerializer(many=True)
+    overflow = serializers.IntegerField(help_text="Tasks due this day beyond per_day")
+
+
+class ActivityQuerySerializer(serializers.Serializer):
+    """Serializer for activity history query parameters"""
+    start = serializers.DateField(required=False, help_text="Defaults to 30 days before end")
+    end = serializers.DateField(required=False, help_text="Inclusive; defaults to today")
+    
+    def validate(self, attrs):
+        """Fill in the default range and ensure it is ordered and not too long"""
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        days = (attrs['end'] - attrs['start']).days + 1
+        if days < 1:
+            raise serializers.ValidationError("end must not be before start.")
+        if days > settings.TASK_ACTIVITY_MAX_DAYS:
+            raise serializers.ValidationError(
+                f"The range may span at most {settings.TASK_ACTIVITY_MAX_DAYS} days."
+            )
+        return attrs
+
+
+class ActivityTransitionSerializer(serializers.Serializer):
+    """Number of tasks moved from one status to another"""
+    from_status = serializers.CharField()
+    to_status = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class ActivityDaySerializer(serializers.Serializer):
+    """One user's task activity on one day"""
+    date = serializers.DateField()
+    created = serializers.IntegerField()
+    completed = serializers.IntegerField(help_text="Tasks moved to (or created as) completed")
+    deleted = serializers.IntegerField()
+    transitions = ActivityTransitionSerializer(many=True, help_text="Status changes of existing tasks")
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    """Serializer for a single request inside a batch"""
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(help_text="API path including query string, e.g. /api/tasks/?page=2")
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of API requests"""
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(
+        default=False,
+        help_text="Run all sub-requests in one transaction and stop at the first failure"
+    )
+    
+    def validate_requests(self, value):
+        """Cap the number of sub-requests per batch"""
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"A batch may contain at most {settings.BATCH_MAX_REQUESTS} requests."
+            )
+        return value
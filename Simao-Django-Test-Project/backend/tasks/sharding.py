@@ -0,0 +1,121 @@
+"""
+Horizontal sharding of tasks by user.
+
+Every Task lives on exactly one database alias from ``settings.TASK_SHARDS``.
+The user -> alias assignment is stored centrally in ``UserShard`` (on the
+default database, next to the auth tables) and cached. With a single shard
+everything stays on ``default`` and no lookups happen at all.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Each shard allocates Task ids from its own range so rows keep their primary
+# key when a user is moved to another shard.
+SHARD_ID_SPAN = 10 ** 12
+SHARDED_TABLES = ('tasks_task', 'tasks_recurrencerule', 'tasks_taskevent', 'tasks_taskactivityday')
+
+CACHE_KEY = 'task-shard:{}'
+
+
+def get_shards():
+    return list(getattr(settings, 'TASK_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+def default_shard_for(user_id):
+    """
+    Initial placement for a user without a stored assignment: users that
+    already have tasks from before sharding was enabled stay on default,
+    everyone else is spread by a stable hash of their id.
+    """
+    from .models import Task
+
+    if Task.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).exists():
+        return DEFAULT_DB_ALIAS
+    shards = get_shards()
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+def shard_for_user(user_id):
+    """
+    Return the database alias holding ``user_id``'s tasks.
+    """
+    if not is_sharded():
+        return DEFAULT_DB_ALIAS
+    key = CACHE_KEY.format(user_id)
+    alias = cache.get(key)
+    if alias is None:
+        from .models import UserShard
+
+        alias = UserShard.objects.get_or_create(
+            user_id=user_id,
+            defaults={'alias': default_shard_for(user_id)},
+        )[0].alias
+        cache.set(key, alias, settings.TASK_SHARD_CACHE_TIMEOUT)
+    return alias
+
+
+def assign_shard(user_id, alias):
+    """Point ``user_id`` at ``alias`` in the shard map"""
+    from .models import UserShard
+
+    UserShard.objects.update_or_create(user_id=user_id, defaults={'alias': alias})
+    cache.delete(CACHE_KEY.format(user_id))
+
+
+def reserve_id_range(alias):
+    """
+    Start the id sequences of ``alias``'s per-user tables at its own
+    SHARD_ID_SPAN block.
+    """
+    shards = get_shards()
+    if alias not in shards or shards.index(alias) == 0:
+        return
+    floor = shards.index(alias) * SHARD_ID_SPAN
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for table in SHARDED_TABLES:
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, floor]
+                    )
+                elif row[0] < floor:
+                    cursor.execute(
+                        'UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [floor, table]
+                    )
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f'SELECT last_value FROM {sequence}')
+                if cursor.fetchone()[0] < floor:
+                    cursor.execute('SELECT setval(%s, %s)', [sequence, floor])
+
+
+def on_post_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    reserve_id_range(using)
+
+
+def on_user_delete(sender, instance, **kwargs):
+    """
+    Remove a user's tasks, recurrence rules and activity from their shard
+    before the user is deleted; the ORM cascade only reaches the default
+    database.
+    """
+    if not is_sharded():
+        return
+    from .models import RecurrenceRule, Task, TaskActivityDay, TaskEvent, UserShard
+
+    alias = UserShard.objects.filter(user_id=instance.pk).values_list('alias', flat=True).first()
+    if alias and alias != DEFAULT_DB_ALIAS:
+        for model in (Task, RecurrenceRule, TaskEvent, TaskActivityDay):
+            model.objects.using(alias).filter(user_id=instance.pk).delete()
+    cache.delete(CACHE_KEY.format(instance.pk))
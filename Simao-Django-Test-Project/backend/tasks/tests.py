@@ -1,9 +1,33 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from datetime import date, timedelta
-from .models import Task
+import msgpack
+from prometheus_client.parser import text_string_to_metric_families
+from taskmanager.schema import get_schema
+from .changelist import EstimatedCountPaginator
+from .models import RecurrenceRule, Task, TaskActivityDay, TaskEvent, UserShard
+from .recurrence import materialize, occurrence_dates
+from .sharding import SHARD_ID_SPAN, assign_shard, shard_for_user
+from taskmanager.profiling import ProfilingMiddleware
+from taskmanager.cache import TieredCache
 
 
 class TaskModelTest(TestCase):
@@ -267,3 +291,782 @@ class TaskAPITest(APITestCase):
             'due_date': str(date.today())
         })
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MessagePackAPITest(APITestCase):
+    """Test cases for MessagePack content negotiation"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='packuser',
+            email='pack@example.com',
+            password='packpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def test_create_and_list_tasks_with_msgpack(self):
+        """Test that a task round-trips through MessagePack unchanged"""
+        response = self.client.post('/api/tasks/', {
+            'title': 'Packed Task',
+            'description': 'Sent as MessagePack',
+            'status': 'pending',
+            'due_date': str(date.today() + timedelta(days=3))
+        }, format='msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        created = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(created['due_date'], str(date.today() + timedelta(days=3)))
+        
+        packed = msgpack.unpackb(
+            self.client.get('/api/tasks/', HTTP_ACCEPT='application/msgpack').content,
+            raw=False
+        )
+        as_json = self.client.get('/api/tasks/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(packed, as_json)
+        self.assertEqual(packed['results'][0]['created_at'], created['created_at'])
+    
+    def test_login_with_msgpack(self):
+        """Test that the auth views accept MessagePack bodies"""
+        self.client.force_authenticate(user=None)
+        response = self.client.post('/api/auth/login/', {
+            'email': 'pack@example.com',
+            'password': 'packpass123'
+        }, format='msgpack')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+    
+    def test_invalid_msgpack_body(self):
+        """Test that a malformed MessagePack body is rejected"""
+        response = self.client.post(
+            '/api/tasks/', b'\xc1', content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskAdminTest(TestCase):
+    """Test cases for the Task admin changelist"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin)
+        for i in range(3):
+            Task.objects.create(
+                user=self.admin,
+                title=f'Admin Task {i}',
+                description='Review',
+                status='completed' if i else 'pending',
+                due_date=date.today()
+            )
+    
+    def test_changelist_search_and_facets(self):
+        """Test that the changelist searches and shows facet counts"""
+        response = self.client.get('/admin/tasks/task/', {'q': 'Admin Task 1', '_facets': 'True'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'Completed (1)')
+        
+        response = self.client.get('/admin/tasks/task/', {'_facets': 'True', 'p': '1'})
+        self.assertContains(response, 'Completed (2)')
+    
+    def test_paginator_counts_exactly_on_small_tables(self):
+        """Test that small result sets still get an exact count"""
+        paginator = EstimatedCountPaginator(Task.objects.all(), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+
+class ShardMapTest(TestCase):
+    """Test cases for the user -> shard map"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='mapuser', password='mappass123')
+    
+    @override_settings(TASK_SHARDS=['default'])
+    def test_unsharded_users_stay_on_default(self):
+        """Test that a single-database setup never touches the shard map"""
+        self.assertEqual(shard_for_user(self.user.pk), 'default')
+        self.assertFalse(UserShard.objects.exists())
+    
+    def test_existing_tasks_pin_user_to_default(self):
+        """Test that users with pre-sharding tasks are mapped to default"""
+        with self.settings(TASK_SHARDS=['default']):
+            Task.objects.create(
+                user=self.user, title='Old', description='Old', due_date=date.today()
+            )
+        with self.settings(TASK_SHARDS=['default', 'shard_1']):
+            self.assertEqual(shard_for_user(self.user.pk), 'default')
+        self.assertEqual(UserShard.objects.get(user=self.user).alias, 'default')
+
+
+@skipUnless(
+    len(settings.TASK_SHARDS) > 1,
+    'Run with TASK_SHARD_COUNT=2 python manage.py test tasks.tests.TaskShardingTest'
+)
+class TaskShardingTest(APITestCase):
+    """Test cases for tasks spread across several databases"""
+    
+    databases = '__all__'
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='sharduser', password='shardpass123')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_tasks_are_stored_on_the_users_shard(self):
+        """Test that API reads and writes go to the user's shard"""
+        assign_shard(self.user.pk, 'shard_1')
+        response = self.client.post('/api/tasks/', {
+            'title': 'Sharded Task',
+            'description': 'Lives on shard_1',
+            'status': 'pending',
+            'due_date': str(date.today())
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreaterEqual(response.data['id'], SHARD_ID_SPAN)
+        self.assertTrue(Task.objects.using('shard_1').filter(user=self.user).exists())
+        self.assertFalse(Task.objects.using('default').filter(user=self.user).exists())
+        
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['results'][0]['user'], 'sharduser')
+    
+    def test_rebalance_moves_tasks_between_shards(self):
+        """Test that moving a user keeps task ids and timestamps"""
+        assign_shard(self.user.pk, 'default')
+        task = Task.objects.create(
+            user=self.user, title='Mover', description='Moves', due_date=date.today()
+        )
+        call_command('rebalance_task_shards', users=[self.user.pk], target='shard_1', stdout=StringIO())
+        
+        moved = Task.objects.using('shard_1').get(pk=task.pk)
+        self.assertEqual(moved.created_at, task.created_at)
+        self.assertFalse(Task.objects.using('default').filter(pk=task.pk).exists())
+        response = self.client.patch(f'/api/tasks/{task.pk}/', {'status': 'completed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.using('shard_1').get(pk=task.pk).status, 'completed')
+        self.assertEqual(TaskEvent.objects.using('shard_1').get(task_id=task.pk).to_status, 3)
+    
+    def test_recurring_tasks_follow_the_user(self):
+        """Test that rules and their occurrences live on, and move with, the user's shard"""
+        assign_shard(self.user.pk, 'shard_1')
+        response = self.client.post('/api/recurrences/', {
+            'title': 'Sharded standup',
+            'description': 'Every day',
+            'frequency': 'daily',
+            'start_date': str(date.today())
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreaterEqual(response.data['id'], SHARD_ID_SPAN)
+        occurrences = Task.objects.using('shard_1').filter(recurrence_id=response.data['id'])
+        self.assertEqual(occurrences.count(), settings.TASK_RECURRENCE_WINDOW_DAYS + 1)
+        
+        call_command('rebalance_task_shards', users=[self.user.pk], target='shard_2', stdout=StringIO())
+        self.assertFalse(RecurrenceRule.objects.using('shard_1').exists())
+        self.assertEqual(
+            Task.objects.using('shard_2').filter(recurrence_id=response.data['id']).count(),
+            settings.TASK_RECURRENCE_WINDOW_DAYS + 1,
+        )
+
+
+class BatchAPITest(APITestCase):
+    """Test cases for the batched request endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='batchuser',
+            email='batch@example.com',
+            password='batchpass123'
+        )
+        self.task = Task.objects.create(
+            user=self.user,
+            title='Batched Task',
+            description='Test',
+            status='pending',
+            due_date=date.today()
+        )
+        response = self.client.post('/api/auth/login/', {
+            'email': 'batch@example.com',
+            'password': 'batchpass123'
+        })
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    
+    def test_batch_runs_requests_in_order(self):
+        """Test that sub-requests run in order as the authenticated user"""
+        response = self.client.post('/api/batch/', {
+            'requests': [
+                {'method': 'GET', 'path': '/api/auth/user/'},
+                {'method': 'PATCH', 'path': f'/api/tasks/{self.task.id}/', 'body': {'status': 'completed'}},
+                {'method': 'GET', 'path': '/api/tasks/?page=1'},
+                {'method': 'GET', 'path': '/api/tasks/999999/'},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['responses']
+        self.assertEqual([r['status'] for r in results], [200, 200, 200, 404])
+        self.assertEqual(results[0]['body']['username'], 'batchuser')
+        self.assertEqual(results[2]['body']['results'][0]['status'], 'completed')
+    
+    def test_atomic_batch_rolls_back_on_failure(self):
+        """Test that a failing sub-request rolls back an atomic batch"""
+        response = self.client.post('/api/batch/', {
+            'atomic': True,
+            'requests': [
+                {'method': 'DELETE', 'path': f'/api/tasks/{self.task.id}/'},
+                {'method': 'POST', 'path': '/api/tasks/', 'body': {'title': 'Missing fields'}},
+            ]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['responses'][0]['status'], 204)
+        self.assertTrue(Task.objects.filter(id=self.task.id).exists())
+    
+    def test_batch_requires_authentication(self):
+        """Test that batches are rejected without credentials"""
+        self.client.credentials()
+        response = self.client.post('/api/batch/', {
+            'requests': [{'method': 'GET', 'path': '/api/tasks/'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TaskCalendarTest(APITestCase):
+    """Test cases for the calendar range endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='caluser', password='calpass123')
+        self.client.force_authenticate(user=self.user)
+        self.day = date(2026, 3, 10)
+        for i in range(4):
+            Task.objects.create(
+                user=self.user, title=f'Busy {i}', description='Test', due_date=self.day
+            )
+        Task.objects.create(
+            user=self.user, title='Later', description='Test', due_date=self.day + timedelta(days=2)
+        )
+        Task.objects.create(
+            user=self.user, title='Out of range', description='Test', due_date=self.day + timedelta(days=40)
+        )
+    
+    def test_calendar_buckets_tasks_by_day(self):
+        """Test that tasks are grouped per day with overflow counts"""
+        response = self.client.get('/api/tasks/calendar/', {
+            'start': '2026-03-01', 'end': '2026-03-31', 'per_day': 3
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([d['date'] for d in response.data], ['2026-03-10', '2026-03-12'])
+        self.assertEqual(len(response.data[0]['tasks']), 3)
+        self.assertEqual(response.data[0]['overflow'], 1)
+        self.assertEqual(response.data[1]['tasks'][0], {
+            'id': Task.objects.get(title='Later').id, 'title': 'Later', 'status': 'pending'
+        })
+    
+    def test_calendar_rejects_invalid_ranges(self):
+        """Test that reversed or overly long ranges are rejected"""
+        response = self.client.get('/api/tasks/calendar/', {'start': '2026-03-31', 'end': '2026-03-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/tasks/calendar/', {'start': '2026-01-01', 'end': '2026-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SchemaViewTest(TestCase):
+    """Test cases for the prebuilt OpenAPI schema endpoint"""
+    
+    def setUp(self):
+        get_schema.cache_clear()
+        self.addCleanup(get_schema.cache_clear)
+    
+    def test_schema_has_validators_and_cache_headers(self):
+        """Test that the schema is cacheable and revalidates with 304"""
+        response = self.client.get('/api/schema/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/api/tasks/', response.content)
+        self.assertIn('max-age=86400', response['Cache-Control'])
+        
+        response = self.client.get('/api/schema/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get('/api/schema/?format=json')
+        self.assertEqual(response.json()['info']['title'], 'Task Manager API')
+    
+    def test_prebuilt_schema_file_is_served(self):
+        """Test that a prebuilt schema file is served as-is"""
+        with tempfile.TemporaryDirectory() as schema_dir:
+            Path(schema_dir, 'schema.yaml').write_bytes(b'openapi: 3.0.3\n')
+            with self.settings(OPENAPI_SCHEMA_PREBUILT=True, OPENAPI_SCHEMA_DIR=Path(schema_dir)):
+                response = self.client.get('/api/schema/')
+        self.assertEqual(response.content, b'openapi: 3.0.3\n')
+
+
+class HealthCheckTest(TestCase):
+    """Test cases for the liveness and readiness probes"""
+    
+    def test_healthz(self):
+        """Test that the liveness probe answers without touching the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+    
+    def test_readyz_checks_databases(self):
+        """Test that the readiness probe reports unreachable databases"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        
+        with patch('taskmanager.health._last_check', {'at': 0.0, 'errors': {}}), \
+                patch.object(connection, 'is_usable', return_value=False):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('default', response.json()['databases'])
+
+
+class StaticFilesStorageTest(TestCase):
+    """Test cases for the hashed, precompressed static files storage"""
+    
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """Test that collectstatic emits hashed names with .gz siblings used by {% static %}"""
+        from django.templatetags.static import static
+        
+        with tempfile.TemporaryDirectory() as static_root:
+            with self.settings(STATIC_ROOT=static_root):
+                call_command('collectstatic', interactive=False, verbosity=0)
+                url = static('admin/css/base.css')
+            
+            self.assertRegex(url, r'^/static/admin/css/base\.[0-9a-f]{12}\.css$')
+            hashed = Path(static_root, url.removeprefix('/static/'))
+            self.assertTrue(hashed.exists())
+            self.assertTrue(Path(f'{hashed}.gz').exists())
+            self.assertLess(Path(f'{hashed}.gz').stat().st_size, hashed.stat().st_size)
+
+
+class MetricsTest(APITestCase):
+    """Test cases for the /metrics endpoint"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='metricsuser', password='testpass123')
+        Task.objects.create(user=self.user, title='Measured Task', due_date=date.today())
+        self.client.force_authenticate(user=self.user)
+    
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+    
+    def sample(self, samples, name, **labels):
+        return samples.get((name, tuple(sorted(labels.items()))), 0)
+    
+    def test_scrape_reports_per_view_metrics(self):
+        """Test that requests are recorded under their viewset action"""
+        before = self.scrape()
+        self.client.get('/api/tasks/')
+        after = self.scrape()
+        
+        def delta(name, **labels):
+            return self.sample(after, name, **labels) - self.sample(before, name, **labels)
+        
+        view = {'view': 'TaskViewSet.list'}
+        self.assertEqual(delta('django_http_requests_total', method='GET', status='200', **view), 1)
+        self.assertEqual(delta('django_http_request_duration_seconds_count', method='GET', **view), 1)
+        self.assertGreater(delta('django_db_queries_per_request_sum', **view), 0)
+        self.assertEqual(delta('django_db_query_duration_seconds_count', **view), 1)
+        self.assertGreater(delta('django_http_response_size_bytes_sum', **view), 0)
+        # The scrape itself is in flight while it renders
+        self.assertEqual(self.sample(after, 'django_http_requests_in_flight'), 1)
+    
+    def test_cache_hits_and_misses(self):
+        """Test that cache lookups are counted as hits or misses"""
+        before = self.scrape()
+        cache.set('metrics-test', 1)
+        cache.get('metrics-test')
+        cache.get('metrics-test-missing')
+        cache.get_many(['metrics-test', 'metrics-test-missing'])
+        after = self.scrape()
+        
+        for result in ('hit', 'miss'):
+            self.assertEqual(
+                self.sample(after, 'django_cache_requests_total', result=result)
+                - self.sample(before, 'django_cache_requests_total', result=result),
+                2,
+            )
+    
+    def test_scrape_merges_worker_processes(self):
+        """Test that metrics written by other worker processes are included"""
+        worker = (
+            'from taskmanager import metrics\n'
+            'metrics.REQUESTS.labels("TaskViewSet.list", "GET", "200").inc(3)\n'
+        )
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': metrics_dir}
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', worker], cwd=settings.BASE_DIR, env=env, check=True)
+            with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': metrics_dir}):
+                samples = self.scrape()
+        
+        self.assertEqual(
+            self.sample(
+                samples, 'django_http_requests_total', view='TaskViewSet.list', method='GET', status='200'
+            ),
+            6,
+        )
+
+
+@override_settings(PROFILING_TOKEN='secret-token', PROFILING_INTERVAL=0.001)
+class ProfilingTest(APITestCase):
+    """Test cases for on-demand request profiling"""
+    
+    def setUp(self):
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        patcher = self.settings(PROFILING_DIR=Path(self.profile_dir.name))
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        
+        self.user = User.objects.create_user(username='profileduser', password='testpass123')
+        Task.objects.bulk_create(
+            Task(user=self.user, title=f'Task {i}', due_date=date.today()) for i in range(50)
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def test_request_with_token_is_profiled(self):
+        """Test that a profile named by view and request id is written"""
+        response = self.client.get('/api/tasks/', HTTP_X_PROFILE='secret-token', HTTP_X_REQUEST_ID='req-42')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        name = response['X-Profile-Id']
+        self.assertTrue(name.endswith('-TaskViewSet.list-req-42'))
+        
+        folded = Path(self.profile_dir.name, f'{name}.folded').read_text()
+        for line in folded.splitlines():
+            self.assertRegex(line, r'^[^ ]+(;[^ ]+)* \d+$')
+        
+        out = StringIO()
+        call_command('profiles', stdout=out)
+        self.assertIn(name, out.getvalue())
+        call_command('profiles', name, stdout=out)
+        self.assertIn('profile(s)', out.getvalue())
+    
+    def test_requests_without_token_are_not_profiled(self):
+        """Test that only authorized requests are profiled"""
+        for header in ({}, {'HTTP_X_PROFILE': 'wrong-token'}):
+            response = self.client.get('/api/tasks/', **header)
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(Path(self.profile_dir.name).iterdir()), [])
+    
+    def test_disabled_without_token_or_sampling(self):
+        """Test that the middleware drops out of the stack when not configured"""
+        with self.settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+    
+    def test_sampled_requests_are_profiled(self):
+        """Test that the sample rate profiles requests without a token"""
+        with self.settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=1.0):
+            response = self.client.get('/api/tasks/')
+        self.assertIn('X-Profile-Id', response)
+
+
+@override_settings(TASK_RECURRENCE_WINDOW_DAYS=14)
+class RecurringTaskTest(APITestCase):
+    """Test cases for recurrence rules and their materialized occurrences"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='recurringuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.today = date.today()
+    
+    def create_rule(self, **data):
+        payload = {'title': 'Standup', 'description': 'Daily standup', 'frequency': 'daily',
+                   'start_date': self.today.isoformat(), **data}
+        response = self.client.post('/api/recurrences/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return RecurrenceRule.objects.get(pk=response.data['id'])
+    
+    def test_creating_rule_fills_window(self):
+        """Test that a new rule creates occurrences for the rolling window only"""
+        rule = self.create_rule()
+        occurrences = Task.objects.filter(recurrence=rule)
+        self.assertEqual(occurrences.count(), 15)
+        self.assertEqual(occurrences.order_by('due_date').first().due_date, self.today)
+        self.assertEqual(rule.materialized_through, self.today + timedelta(days=14))
+        
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(response.data['results'][0]['recurrence'], rule.id)
+    
+    def test_past_start_is_not_backfilled(self):
+        """Test that a rule starting long ago only gets upcoming occurrences"""
+        rule = self.create_rule(frequency='weekly', start_date=(self.today - timedelta(days=365)).isoformat())
+        due_dates = list(Task.objects.filter(recurrence=rule).values_list('due_date', flat=True))
+        self.assertEqual(len(due_dates), 2)
+        self.assertTrue(all(self.today <= due_date <= self.today + timedelta(days=14) for due_date in due_dates))
+    
+    def test_occurrence_dates(self):
+        """Test monthly rules clamp to month ends and intervals are honoured"""
+        rule = RecurrenceRule(frequency='monthly', interval=1, start_date=date(2024, 1, 31))
+        self.assertEqual(
+            list(occurrence_dates(rule, date(2024, 1, 1), date(2024, 4, 30))),
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)],
+        )
+        rule = RecurrenceRule(frequency='daily', interval=3, start_date=date(2024, 1, 1),
+                              end_date=date(2024, 1, 12))
+        self.assertEqual(
+            list(occurrence_dates(rule, date(2024, 1, 4), date(2024, 12, 31))),
+            [date(2024, 1, 7), date(2024, 1, 10)],
+        )
+    
+    def test_materializing_is_idempotent_and_rolls_forward(self):
+        """Test that re-running only adds the days that entered the window"""
+        rule = self.create_rule()
+        later = self.today + timedelta(days=5)
+        materialize(RecurrenceRule.objects.filter(pk=rule.pk), today=later)
+        materialize(RecurrenceRule.objects.filter(pk=rule.pk), today=later)
+        self.assertEqual(Task.objects.filter(recurrence=rule).count(), 20)
+        
+        RecurrenceRule.objects.filter(pk=rule.pk).update(materialized_through=None)
+        call_command('materialize_recurring_tasks', stdout=StringIO())
+        self.assertEqual(Task.objects.filter(recurrence=rule).count(), 20)
+    
+    def test_many_rules_use_bulk_queries(self):
+        """Test that the periodic job's query count does not grow per rule"""
+        RecurrenceRule.objects.bulk_create(
+            RecurrenceRule(user=self.user, title=f'Rule {i}', description='', frequency='daily',
+                           start_date=self.today)
+            for i in range(200)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            call_command('materialize_recurring_tasks', stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 200 * 15)
+        self.assertLess(len(queries), 60)
+    
+    def test_update_and_delete_keep_worked_occurrences(self):
+        """Test that schedule changes replace only pending upcoming occurrences"""
+        rule = self.create_rule()
+        done = Task.objects.get(recurrence=rule, due_date=self.today)
+        done.status = 'completed'
+        done.save()
+        
+        response = self.client.patch(f'/api/recurrences/{rule.id}/', {'frequency': 'weekly'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.filter(recurrence=rule).count(), 3)
+        self.assertEqual(Task.objects.get(pk=done.pk).status, 'completed')
+        
+        response = self.client.delete(f'/api/recurrences/{rule.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [done.pk])
+        self.assertIsNone(Task.objects.get(pk=done.pk).recurrence)
+    
+    def test_rules_are_private(self):
+        """Test that users only see their own rules"""
+        rule = self.create_rule()
+        other = User.objects.create_user(username='otherrecurring', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/api/recurrences/{rule.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CACHES={
+    'default': settings.CACHES['default'],
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test'},
+})
+class TieredCacheTest(TestCase):
+    """Test cases for the two-level cache with stampede protection"""
+    
+    def setUp(self):
+        cache.clear()
+    
+    def worker_cache(self, name, **options):
+        """A cache with its own local level, like one worker process"""
+        return TieredCache(f'{self.id()}-{name}', {'OPTIONS': {'SHARED': 'shared', **options}})
+    
+    def test_local_level_fronts_shared_level(self):
+        """Test that reads are served locally and writes reach the shared level"""
+        first, second = self.worker_cache('a'), self.worker_cache('b')
+        first.set('key', 'value', 30)
+        self.assertEqual(second.get('key'), 'value')
+        self.assertEqual(second.get('key'), 'value')
+        self.assertEqual(second.stats(), {'shared_hits': 1, 'local_hits': 1})
+        self.assertIsNone(second.get('missing'))
+        self.assertEqual(second.stats()['misses'], 1)
+    
+    def test_only_one_recomputation_under_contention(self):
+        """Test that concurrent misses on several workers compute the value once"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'expensive'
+        
+        workers = [self.worker_cache(f'worker-{i}') for i in range(8)]
+        results = []
+        barrier = threading.Barrier(len(workers))
+        
+        def request(worker):
+            barrier.wait()
+            results.append(worker.get_or_compute('hot-key', compute, timeout=30))
+        
+        threads = [threading.Thread(target=request, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['expensive'] * len(workers))
+        self.assertEqual(sum(worker.stats().get('recomputes', 0) for worker in workers), 1)
+    
+    def test_stale_value_served_while_one_worker_refreshes(self):
+        """Test stale-while-revalidate: a stale key is refreshed by a single caller"""
+        first, second = self.worker_cache('a'), self.worker_cache('b')
+        self.assertEqual(first.get_or_compute('swr', lambda: 'v1', timeout=0.05, stale_timeout=30), 'v1')
+        time.sleep(0.1)
+        
+        refreshing = threading.Event()
+        release = threading.Event()
+        
+        def slow_compute():
+            refreshing.set()
+            release.wait(5)
+            return 'v2'
+        
+        refresher = threading.Thread(target=first.get_or_compute, args=('swr', slow_compute),
+                                     kwargs={'timeout': 30})
+        refresher.start()
+        refreshing.wait(5)
+        # The other worker gets the stale value instead of waiting or recomputing
+        self.assertEqual(second.get_or_compute('swr', lambda: self.fail('recomputed'), timeout=30), 'v1')
+        self.assertEqual(second.stats()['stale'], 1)
+        release.set()
+        refresher.join()
+        self.assertEqual(second.get_or_compute('swr', lambda: self.fail('recomputed'), timeout=30), 'v2')
+    
+    def test_ttl_jitter(self):
+        """Test that lifetimes are stretched by at most the jitter fraction"""
+        worker = self.worker_cache('jitter', JITTER=0.5)
+        timeouts = {worker._jittered(100) for _ in range(50)}
+        self.assertTrue(all(100 <= timeout <= 150 for timeout in timeouts))
+        self.assertGreater(len(timeouts), 1)
+
+
+class TaskReadCacheTest(APITestCase):
+    """Test cases for cached task list and calendar reads"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cacheduser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        Task.objects.create(user=self.user, title='First', description='', due_date=date.today())
+    
+    def test_list_is_cached_until_tasks_change(self):
+        """Test that repeated list reads skip the task queries and writes show up at once"""
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tasks/').data['count'], 1)
+        self.assertFalse([q for q in queries.captured_queries if 'tasks_task' in q['sql']])
+        
+        response = self.client.post('/api/tasks/', {
+            'title': 'Second', 'description': 'Added later', 'status': 'pending',
+            'due_date': str(date.today())
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 2)
+        
+        Task.objects.filter(title='First').delete()
+        response = self.client.get(f'/api/tasks/calendar/?start={date.today()}&end={date.today()}')
+        self.assertEqual([task['title'] for task in response.data[0]['tasks']], ['Second'])
+
+
+class TaskActivityTest(APITestCase):
+    """Test cases for the task activity log and its daily rollups"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='activityuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+    
+    def create_task(self, title, task_status='pending'):
+        response = self.client.post('/api/tasks/', {
+            'title': title, 'description': 'Tracked', 'status': task_status,
+            'due_date': str(date.today())
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+    
+    def test_api_writes_are_logged_and_rolled_up(self):
+        """Test that creates, status changes and deletes land in the log and the rollups"""
+        first = self.create_task('First')
+        second = self.create_task('Second')
+        self.create_task('Done already', task_status='completed')
+        self.client.patch(f'/api/tasks/{first}/', {'status': 'in_progress'})
+        self.client.patch(f'/api/tasks/{first}/', {'status': 'completed'})
+        self.client.patch(f'/api/tasks/{second}/', {'title': 'Renamed'})
+        self.client.delete(f'/api/tasks/{second}/')
+        
+        self.assertEqual(TaskEvent.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(
+            list(TaskEvent.objects.filter(task_id=second).order_by('id').values_list('from_status', 'to_status')),
+            [(0, 1), (1, 0)]
+        )
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/activity/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries.captured_queries if 'tasks_taskevent' in q['sql']])
+        self.assertEqual(response.data, [{
+            'date': str(date.today()),
+            'created': 3,
+            'completed': 2,
+            'deleted': 1,
+            'transitions': [
+                {'from_status': 'pending', 'to_status': 'in_progress', 'count': 1},
+                {'from_status': 'in_progress', 'to_status': 'completed', 'count': 1},
+            ],
+        }])
+    
+    def test_history_is_per_user_and_ranged(self):
+        """Test that other users' activity and days outside the range are excluded"""
+        other = User.objects.create_user(username='otheractivity', password='testpass123')
+        TaskActivityDay.objects.create(
+            user=self.user, day=date.today() - timedelta(days=40), from_status=0, to_status=1, count=5
+        )
+        TaskActivityDay.objects.create(user=other, day=date.today(), from_status=0, to_status=1, count=2)
+        self.assertEqual(self.client.get('/api/tasks/activity/').data, [])
+        
+        start = date.today() - timedelta(days=45)
+        response = self.client.get(f'/api/tasks/activity/?start={start}')
+        self.assertEqual([day['created'] for day in response.data], [5])
+        
+        response = self.client.get(f'/api/tasks/activity/?start={date.today()}&end={start}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_admin_changes_are_logged(self):
+        """Test that status changes and deletions made in the admin are recorded"""
+        admin = User.objects.create_superuser(
+            username='activityadmin', email='activityadmin@example.com', password='adminpass123'
+        )
+        self.client.force_login(admin)
+        task = Task.objects.create(
+            user=self.user, title='Admin edit', description='Edited', due_date=date.today()
+        )
+        response = self.client.post(f'/admin/tasks/task/{task.pk}/change/', {
+            'user': self.user.pk, 'title': 'Admin edit', 'description': 'Edited',
+            'status': 'completed', 'due_date': str(date.today())
+        })
+        self.assertEqual(response.status_code, 302)
+        self.client.post(f'/admin/tasks/task/{task.pk}/delete/', {'post': 'yes'})
+        
+        events = TaskEvent.objects.filter(task_id=task.pk).order_by('id')
+        self.assertEqual(list(events.values_list('from_status', 'to_status', 'source')), [
+            (1, 3, TaskEvent.SOURCE_ADMIN), (3, 0, TaskEvent.SOURCE_ADMIN)
+        ])
+        self.assertEqual(
+            TaskActivityDay.objects.get(user=self.user, from_status=1, to_status=3).count, 1
+        )
@@ -6,6 +6,7 @@ from . import views
 # Create router for viewsets
 router = DefaultRouter()
 router.register(r'tasks', views.TaskViewSet, basename='task')
+router.register(r'recurrences', views.RecurrenceRuleViewSet, basename='recurrence')
 
 urlpatterns = [
     # Router URLs (includes all CRUD operations for tasks)
@@ -17,5 +18,8 @@ urlpatterns = [
     path('auth/logout/', views.logout, name='logout'),
     path('auth/user/', views.get_current_user, name='current-user'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    
+    # Run several API requests in one round trip
+    path('batch/', views.batch, name='batch'),
 ]
 
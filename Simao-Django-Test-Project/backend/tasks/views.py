@@ -1,13 +1,28 @@
+import json
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve, reverse
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from .models import Task
-from .serializers import TaskSerializer, UserSerializer, LoginSerializer, LogoutSerializer
+from . import activity
+from .caching import cached_task_read
+from .models import RecurrenceRule, Task, TaskEvent
+from .recurrence import clear_upcoming, materialize
+from .serializers import (
+    TaskSerializer, UserSerializer, LoginSerializer, LogoutSerializer, BatchSerializer,
+    CalendarQuerySerializer, CalendarDaySerializer, RecurrenceRuleSerializer,
+    ActivityQuerySerializer, ActivityDaySerializer
+)
+from .sharding import shard_for_user
 
 
 class TaskViewSet(viewsets.ModelViewSet):
@@ -19,12 +34,125 @@ class TaskViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        # Return only tasks belonging to the current user
-        return Task.objects.filter(user=self.request.user)
+        # Return only tasks belonging to the current user, from their shard
+        return Task.objects.for_user(self.request.user)
     
     def perform_create(self, serializer):
         # Automatically set the user to the current user
-        serializer.save(user=self.request.user)
+        with transaction.atomic(using=shard_for_user(self.request.user.pk)):
+            task = serializer.save(user=self.request.user)
+            activity.record([(task, None, task.status)], TaskEvent.SOURCE_API)
+    
+    def perform_update(self, serializer):
+        previous_status = serializer.instance.status
+        with transaction.atomic(using=serializer.instance._state.db):
+            task = serializer.save()
+            activity.record([(task, previous_status, task.status)], TaskEvent.SOURCE_API)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic(using=instance._state.db):
+            activity.record([(instance, instance.status, None)], TaskEvent.SOURCE_API)
+            instance.delete()
+    
+    def list(self, request, *args, **kwargs):
+        # Cached per user until their tasks change (see tasks/caching.py)
+        data = cached_task_read(
+            request.user.pk, 'list', request.build_absolute_uri(),
+            lambda: super(TaskViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+    
+    @extend_schema(
+        parameters=[CalendarQuerySerializer],
+        responses={
+            200: CalendarDaySerializer(many=True),
+            400: {'description': 'Bad Request - Invalid or too long date range'}
+        }
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def calendar(self, request):
+        """
+        Tasks due between start and end, bucketed per day
+        
+        Reads only the summary columns in the range, which the
+        (user, due_date, id, status, title) index covers.
+        """
+        query = CalendarQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        start, end, per_day = (query.validated_data[key] for key in ('start', 'end', 'per_day'))
+        data = cached_task_read(
+            request.user.pk, 'calendar', f'{start}:{end}:{per_day}',
+            lambda: self.calendar_days(start, end, per_day),
+        )
+        return Response(data)
+    
+    def calendar_days(self, start, end, per_day):
+        rows = (
+            self.get_queryset()
+            .filter(due_date__gte=start, due_date__lte=end)
+            .order_by('due_date', 'id')
+            .values_list('due_date', 'id', 'title', 'status')
+        )
+        days = []
+        for due_date, task_id, title, task_status in rows.iterator():
+            if not days or days[-1]['date'] != due_date:
+                days.append({'date': due_date, 'tasks': [], 'overflow': 0})
+            bucket = days[-1]
+            if len(bucket['tasks']) < per_day:
+                bucket['tasks'].append({'id': task_id, 'title': title, 'status': task_status})
+            else:
+                bucket['overflow'] += 1
+        return CalendarDaySerializer(days, many=True).data
+    
+    @extend_schema(
+        parameters=[ActivityQuerySerializer],
+        responses={
+            200: ActivityDaySerializer(many=True),
+            400: {'description': 'Bad Request - Invalid or too long date range'}
+        }
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def activity(self, request):
+        """
+        Tasks created, completed and deleted and status changes per day
+        
+        Served from the daily rollups (see tasks/activity.py); days without
+        activity are omitted. Defaults to the last 30 days.
+        """
+        query = ActivityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        days = activity.history(request.user, query.validated_data['start'], query.validated_data['end'])
+        return Response(ActivityDaySerializer(days, many=True).data)
+
+
+class RecurrenceRuleViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for recurring task rules
+    Occurrences are created as regular tasks for the next
+    TASK_RECURRENCE_WINDOW_DAYS days; the periodic job keeps extending them
+    """
+    serializer_class = RecurrenceRuleSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return RecurrenceRule.objects.for_user(self.request.user)
+    
+    def perform_create(self, serializer):
+        rule = serializer.save(user=self.request.user)
+        materialize([rule])
+    
+    def perform_update(self, serializer):
+        # Regenerate upcoming occurrences from the new schedule and template
+        with transaction.atomic(using=serializer.instance._state.db):
+            clear_upcoming(serializer.instance)
+            rule = serializer.save()
+            materialize([rule])
+    
+    def perform_destroy(self, instance):
+        # Completed and in-progress occurrences are kept (unlinked)
+        with transaction.atomic(using=instance._state.db):
+            clear_upcoming(instance)
+            instance.delete()
 
 
 @extend_schema(
@@ -196,3 +324,116 @@ def get_current_user(request):
     """
     serializer = UserSerializer(request.user)
     return Response(serializer.data)
+
+
+def _dispatch_sub_request(request, method, path, body):
+    """
+    Run one batched request against the tasks URLconf in-process.
+
+    The sub-request reuses the outer request's headers and its already
+    authenticated user, so JWT validation and middleware run only once.
+    Returns a (status_code, data) pair.
+    """
+    api_prefix = reverse('batch')[:-len('batch/')]
+    url = urlsplit(path)
+    if not url.path.startswith(api_prefix):
+        return status.HTTP_404_NOT_FOUND, {'detail': f'Path must start with {api_prefix}'}
+    try:
+        match = resolve(url.path[len(api_prefix) - 1:], urlconf='tasks.urls')
+    except Resolver404:
+        return status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'}
+    if match.url_name == 'batch':
+        return status.HTTP_400_BAD_REQUEST, {'detail': 'Batches cannot be nested.'}
+
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING', 'HTTP_ACCEPT')
+    }
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path.encode().decode('iso-8859-1'),
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    sub_request.resolver_match = match
+    sub_request.user = request.user
+    # Picked up by DRF's Request: skip re-authenticating every sub-request
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+
+    response = match.func(sub_request, *match.args, **match.kwargs)
+    if hasattr(response, 'data'):
+        return response.status_code, response.data
+    return response.status_code, response.content.decode(response.charset) or None
+
+
+@extend_schema(
+    request=BatchSerializer,
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'responses': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'status': {'type': 'integer'},
+                            'body': {}
+                        }
+                    }
+                }
+            }
+        },
+        400: {'description': 'Bad Request - Invalid batch, or an atomic batch was rolled back'}
+    },
+    examples=[
+        OpenApiExample(
+            'Dashboard Load Example',
+            value={
+                'requests': [
+                    {'method': 'GET', 'path': '/api/auth/user/'},
+                    {'method': 'GET', 'path': '/api/tasks/'},
+                    {'method': 'GET', 'path': '/api/tasks/?page=2'}
+                ]
+            },
+            request_only=True
+        )
+    ]
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def batch(request):
+    """
+    Run several API requests in one round trip and return their results in order
+    """
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    sub_requests = serializer.validated_data['requests']
+    responses = []
+
+    if not serializer.validated_data['atomic']:
+        for sub in sub_requests:
+            code, data = _dispatch_sub_request(request, sub['method'], sub['path'], sub.get('body'))
+            responses.append({'status': code, 'body': data})
+        return Response({'responses': responses})
+
+    # Task writes land on the user's shard, so that is the connection to wrap
+    using = shard_for_user(request.user.pk)
+    with transaction.atomic(using=using):
+        for index, sub in enumerate(sub_requests):
+            code, data = _dispatch_sub_request(request, sub['method'], sub['path'], sub.get('body'))
+            responses.append({'status': code, 'body': data})
+            if code >= 400:
+                transaction.set_rollback(True, using=using)
+                return Response({
+                    'error': f'Request {index} failed; the batch was rolled back',
+                    'responses': responses
+                }, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'responses': responses})
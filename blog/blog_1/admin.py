@@ -2,16 +2,18 @@ from django.contrib import admin
 
 # Register your models here.
 
-from .models import Post, Comment
+from .changelist import ScalableAdminMixin
+from .models import Post, Comment, OutgoingEmail
 
 
 # admin.site.register(Post)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("title", "slug", "author", "publish", "status")
     list_filter = ("status", "created", "publish", "author")
+    list_select_related = ("author",)
     search_fields = ["title", "body"]
     prepopulated_fields = {"slug": ("title",)}
     raw_id_fields = ["author"]
@@ -21,7 +23,16 @@ class PostAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ["name", "email", "post", "created", "active"]
     list_filter = ("created", "updated", "active")
+    list_select_related = ("post",)
     search_fields = ["name", "email", "body"]
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ["subject", "status", "attempts", "next_attempt_at", "created"]
+    list_filter = ("status",)
+    search_fields = ["subject"]
+    readonly_fields = ["sent_at", "last_error"]
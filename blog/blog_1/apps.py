@@ -1,6 +1,57 @@
 from django.apps import AppConfig
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 
 
 class Blog1Config(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blog_1"
+
+    def ready(self):
+        from .caching import on_comment_change, on_post_change, on_post_tags_changed
+        from .counters import on_comment_deleted, on_comment_pre_save, on_comment_saved
+        from .http_cache import invalidate_validators
+        from .http_cache import on_post_pre_delete as purge_deleted_post
+        from .http_cache import on_post_saved as purge_saved_post
+        from .models import Comment, Post
+        from .sitemaps import on_post_change as update_sitemap
+        from .sitemaps import on_post_pre_save as locate_in_sitemap
+        from .sitemaps import on_tags_changed as update_tag_sitemap
+        from .similarity import (
+            on_post_pre_delete,
+            on_post_pre_save,
+            on_post_saved,
+            on_tags_changed,
+        )
+
+        # Keep Post.comment_count and the cached sidebar and pages up to date
+        pre_save.connect(on_comment_pre_save, sender=Comment)
+        post_save.connect(on_comment_saved, sender=Comment)
+        post_delete.connect(on_comment_deleted, sender=Comment)
+        post_save.connect(on_comment_change, sender=Comment)
+        post_delete.connect(on_comment_change, sender=Comment)
+        post_save.connect(on_post_change, sender=Post)
+        pre_delete.connect(on_post_change, sender=Post)
+        m2m_changed.connect(on_post_tags_changed, sender=Post.tags.through)
+        # Re-rank similar posts when tags or publication status change
+        m2m_changed.connect(on_tags_changed, sender=Post.tags.through)
+        pre_save.connect(on_post_pre_save, sender=Post)
+        post_save.connect(on_post_saved, sender=Post)
+        pre_delete.connect(on_post_pre_delete, sender=Post)
+        # HTTP validators and the nginx cache
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_validators, sender=Post)
+            signal.connect(invalidate_validators, sender=Comment)
+        m2m_changed.connect(invalidate_validators, sender=Post.tags.through)
+        post_save.connect(purge_saved_post, sender=Post)
+        pre_delete.connect(purge_deleted_post, sender=Post)
+        # Sitemap sections
+        pre_save.connect(locate_in_sitemap, sender=Post)
+        post_save.connect(update_sitemap, sender=Post)
+        post_delete.connect(update_sitemap, sender=Post)
+        m2m_changed.connect(update_tag_sitemap, sender=Post.tags.through)
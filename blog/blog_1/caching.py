@@ -0,0 +1,195 @@
+"""
+Cached blog pages and page fragments.
+
+The sidebar in base.html (post count, latest and most commented posts) is
+the same on every page, so it is rendered once and cached until a post is
+saved or deleted or a comment changes a post's comment count.
+
+Whole pages are cached for anonymous GETs (``cache_anonymous_page``), keyed
+by host, path and query string. While rendering, a view declares what the
+page shows with ``depend_on(request, "post:12", "tag:django", ...)``; the
+cached entry remembers the current generation of each of those dependency
+keys and is only served while none of them has moved on. Post, tag and
+comment changes bump just the keys they affect (see the handlers below).
+
+Per-visitor parts are punched out of the stored HTML and filled in on every
+hit: the CSRF token of the comment form gets a fresh token for the visitor
+(and their CSRF cookie), and the sidebar is taken from its own cache so
+sidebar changes don't invalidate every page.
+"""
+
+import hashlib
+import re
+import uuid
+from functools import wraps
+
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+SIDEBAR_KEY = "blog:sidebar"
+# Changes invalidate the sidebar right away; this only bounds its lifetime
+SIDEBAR_TIMEOUT = 600
+
+PAGE_KEY = "blog:page:{}"
+DEPENDENCY_KEY = "blog:dependency:{}"
+# Pages are invalidated through their dependencies; this bounds their lifetime
+PAGE_TIMEOUT = 3600
+LISTING = "listing"
+
+SIDEBAR_HOLE = "<!--page-cache:sidebar-->"
+CSRF_HOLE = "page-cache-csrf-token"
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def cached_sidebar():
+    return cache.get_or_compute(
+        SIDEBAR_KEY,
+        lambda: render_to_string("blog/sidebar.html"),
+        timeout=SIDEBAR_TIMEOUT,
+    )
+
+
+def invalidate_sidebar():
+    # After commit, so a concurrent request can't cache the old state again
+    transaction.on_commit(lambda: cache.delete(SIDEBAR_KEY))
+
+
+def dependency_cache():
+    # Generations must not be served from a worker's local level
+    return caches["shared"]
+
+
+def depend_on(request, *keys):
+    """
+    Declare that the page being rendered for ``request`` shows ``keys``.
+    Their generations are read now, so declare them before reading the data
+    they cover where possible: a change committed in between then leaves the
+    cached page already stale instead of wrongly fresh.
+    """
+    if hasattr(request, "page_dependencies"):
+        request.page_dependencies.update(_generations(keys))
+
+
+def invalidate_pages(*keys):
+    """Start new generations of ``keys``, dropping every page that shows them"""
+    generations = {DEPENDENCY_KEY.format(key): uuid.uuid4().hex for key in set(keys)}
+    transaction.on_commit(lambda: dependency_cache().set_many(generations, None))
+
+
+def generation(key):
+    """Current generation of dependency ``key``; changes when it is invalidated"""
+    return _generations([key])[key]
+
+
+def _generations(keys):
+    """Current generation of each dependency key (created if missing)"""
+    shared = dependency_cache()
+    names = {DEPENDENCY_KEY.format(key): key for key in keys}
+    found = shared.get_many(names)
+    for name in names.keys() - found.keys():
+        shared.add(name, uuid.uuid4().hex, None)
+        found[name] = shared.get(name)
+    return {names[name]: generation for name, generation in found.items()}
+
+
+def _fill_holes(request, content):
+    if SIDEBAR_HOLE in content:
+        content = content.replace(SIDEBAR_HOLE, cached_sidebar())
+    if CSRF_HOLE in content:
+        content = content.replace(CSRF_HOLE, get_token(request))
+    return content
+
+
+def punch_holes(content):
+    """``content`` with the visitor's CSRF token replaced by a placeholder"""
+    tokens = set(CSRF_INPUT.findall(content))
+    for token in tokens:
+        content = content.replace(token, CSRF_HOLE)
+    return content
+
+
+def cache_anonymous_page(view):
+    """Serve ``view``'s pages to anonymous visitors from the page cache"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        location = f"{request.get_host()}{request.get_full_path()}"
+        key = PAGE_KEY.format(hashlib.md5(location.encode()).hexdigest())
+        entry = cache.get(key)
+        if entry is not None:
+            generations, content_type, content = entry
+            if _generations(generations) == generations:
+                response = HttpResponse(
+                    _fill_holes(request, content), content_type=content_type
+                )
+                response["X-Page-Cache"] = "hit"
+                return response
+
+        request.page_dependencies = {}
+        request.page_cache_holes = True
+        response = view(request, *args, **kwargs)
+        if response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and not response.cookies
+            and request.page_dependencies
+        ):
+            entry = (
+                request.page_dependencies,
+                response["Content-Type"],
+                punch_holes(content),
+            )
+            cache.set(key, entry, PAGE_TIMEOUT)
+        response.content = _fill_holes(request, content)
+        response["X-Page-Cache"] = "miss"
+        return response
+
+    return wrapper
+
+
+def on_post_change(sender, instance, raw=False, **kwargs):
+    # Connected to pre_delete (not post_delete) so the tags are still there
+    from .models import SimilarPost
+
+    invalidate_sidebar()
+    if raw:
+        return
+    shown_on = SimilarPost.objects.filter(similar=instance).values_list(
+        "post_id", flat=True
+    )
+    invalidate_pages(
+        LISTING,
+        f"post:{instance.pk}",
+        *(f"post:{post_id}" for post_id in shown_on),
+        *(f"tag:{slug}" for slug in instance.tags.values_list("slug", flat=True)),
+    )
+
+
+def on_post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from taggit.models import Tag
+
+    from .models import Post
+
+    if reverse or not isinstance(instance, Post):
+        return
+    if action in ("post_add", "post_remove"):
+        tags = Tag.objects.filter(pk__in=pk_set)
+    elif action == "pre_clear":
+        tags = instance.tags.all()
+    else:
+        return
+    slugs = tags.values_list("slug", flat=True)
+    invalidate_pages(LISTING, f"post:{instance.pk}", *(f"tag:{slug}" for slug in slugs))
+
+
+def on_comment_change(sender, instance, raw=False, **kwargs):
+    invalidate_pages(f"post:{instance.post_id}")
@@ -0,0 +1,101 @@
+import hashlib
+import json
+
+from django.contrib.admin.filters import FacetsMixin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR, PAGE_VAR
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Planner row estimate for a queryset (pg_class.reltuples when unfiltered,
+    EXPLAIN otherwise). Returns None when no estimate is available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table has been vacuumed or analyzed
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner estimate instead of COUNT(*) once a result set is large
+    enough that an approximate total is acceptable.
+    """
+
+    exact_count_threshold = 100000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+
+class CachedFacetChangeList(ChangeList):
+    """
+    Caches facet counts per filter and per query string (ignoring page and
+    ordering), so show_facets doesn't cost one aggregate per filter per page.
+    """
+
+    def get_filters(self, request):
+        filters = super().get_filters(request)
+        for spec in filters[0]:
+            if isinstance(spec, FacetsMixin):
+                spec.get_facet_queryset = self._cached_facets(request, spec)
+        return filters
+
+    def _cached_facets(self, request, spec):
+        get_facet_queryset = spec.get_facet_queryset
+        params = sorted(
+            (key, value)
+            for key, value in request.GET.lists()
+            if key not in (PAGE_VAR, ORDER_VAR)
+        )
+        digest = hashlib.md5(
+            repr(
+                (type(spec).__name__, str(spec.title), spec.expected_parameters(), params)
+            ).encode()
+        ).hexdigest()
+        key = f"admin-facets:{self.opts.label_lower}:{digest}"
+        timeout = self.model_admin.facet_cache_timeout
+
+        def cached_facet_queryset(changelist):
+            counts = cache.get(key)
+            if counts is None:
+                counts = get_facet_queryset(changelist)
+                cache.set(key, counts, timeout)
+            return counts
+
+        return cached_facet_queryset
+
+
+class ScalableAdminMixin:
+    """
+    Estimated counts, no unfiltered total and cached facets for big changelists.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    facet_cache_timeout = 300
+
+    def get_changelist(self, request, **kwargs):
+        return CachedFacetChangeList
@@ -0,0 +1,48 @@
+"""
+Denormalized Post.comment_count.
+
+Kept in step with the post's active comments whenever a comment is created,
+deleted, (de)activated or moved to another post, with atomic ``F()``
+updates so concurrent comments don't lose counts.
+"""
+
+from django.db.models import F
+
+from .caching import invalidate_sidebar
+from .models import Comment, Post
+
+
+def _adjust(post_id, delta):
+    Post.objects.filter(pk=post_id).update(comment_count=F("comment_count") + delta)
+
+
+def on_comment_pre_save(sender, instance, raw=False, **kwargs):
+    # The (post, active) pair the counters currently reflect
+    instance._counted = None
+    if instance.pk is not None and not raw:
+        instance._counted = (
+            Comment.objects.filter(pk=instance.pk)
+            .values_list("post_id", "active")
+            .first()
+        )
+
+
+def on_comment_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_counted", None)
+    after = (instance.post_id, instance.active)
+    if before == after:
+        return
+    if before and before[1]:
+        _adjust(before[0], -1)
+    if instance.active:
+        _adjust(instance.post_id, 1)
+    if (before and before[1]) or instance.active:
+        invalidate_sidebar()
+
+
+def on_comment_deleted(sender, instance, **kwargs):
+    if instance.active:
+        _adjust(instance.post_id, -1)
+        invalidate_sidebar()
@@ -0,0 +1,229 @@
+"""
+Static export of the published blog.
+
+``manage.py export_static`` renders every public page -- post pages, list
+and tag pages, the feeds and the sitemap -- into a directory that nginx
+serves to anonymous visitors, falling back to Django for everything else
+(see nginx/nginx.conf).
+
+Each page gets a fingerprint of the data it shows: ``Post.updated`` and the
+tags of its posts, and for post pages their active comments and similar
+posts. The fingerprints are kept in a manifest next to the pages, so an
+export only re-renders the pages whose fingerprint changed and removes the
+ones that are gone: a new comment re-renders one post page, a new post its
+list and tag pages plus the feed and the sitemap. Pages are rendered in
+parallel by a process pool.
+
+Pages are rendered with the same holes as the page cache (see caching.py):
+the sidebar is written once to SIDEBAR_FILE and included with an nginx SSI
+directive, and so is the comment form's CSRF token, which ``csrf_token``
+answers for the visitor's own CSRF cookie.
+"""
+
+import hashlib
+import inspect
+import json
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.db import connections
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from taggit.models import TaggedItem
+
+from .caching import CSRF_HOLE, SIDEBAR_HOLE, punch_holes
+from .feeds import FEED_ITEMS
+from .models import Comment, Post, SimilarPost
+from .views import POSTS_PER_PAGE
+
+MANIFEST = ".manifest.json"
+SIDEBAR_FILE = "_sidebar.html"
+SSI_INCLUDE = '<!--# include virtual="{}" -->'
+
+
+def _fingerprint(*state):
+    return hashlib.md5(repr(state).encode()).hexdigest()
+
+
+def page_key(url, page=None):
+    return f"{url}?page={page}" if page else url
+
+
+def plan():
+    """{page key: (url, page number, fingerprint)} of every page to export"""
+    tags = defaultdict(list)
+    tagged = (
+        TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+        .order_by("object_id", "tag__slug")
+        .values_list("object_id", "tag__slug")
+    )
+    for post_id, slug in tagged.iterator():
+        tags[post_id].append(slug)
+    comments = {
+        post_id: (last.isoformat(), total)
+        for post_id, last, total in Comment.objects.filter(active=True)
+        .values("post")
+        .annotate(last=Max("updated"), total=Count("pk"))
+        .values_list("post", "last", "total")
+    }
+    similar = defaultdict(list)
+    rows = SimilarPost.objects.values_list("post_id", "similar_id", "similar__updated")
+    for post_id, similar_id, updated in rows.iterator():
+        similar[post_id].append((similar_id, updated.isoformat()))
+
+    pages = {}
+    home = reverse("blog_1:post_lists")
+    listed = defaultdict(list)
+    published_tags = set()
+    posts = Post.published.values_list("pk", "url_path", "updated")
+    for pk, url_path, updated in posts.iterator():
+        state = (pk, updated.isoformat(), tags[pk])
+        pages[page_key(url_path)] = (
+            url_path,
+            None,
+            _fingerprint(state, comments.get(pk), similar[pk]),
+        )
+        listed[home].append(state)
+        published_tags.update(tags[pk])
+        for slug in tags[pk]:
+            listed[reverse("blog_1:post_list_by_tag", args=[slug])].append(state)
+
+    for url, states in listed.items():
+        num_pages = math.ceil(len(states) / POSTS_PER_PAGE)
+        for number in range(1, num_pages + 1):
+            start = (number - 1) * POSTS_PER_PAGE
+            fingerprint = _fingerprint(
+                states[start : start + POSTS_PER_PAGE], num_pages
+            )
+            pages[page_key(url, number)] = (url, number, fingerprint)
+            # The bare URL shows page 1; ?page=1 is what "Previous" links to
+            if number == 1:
+                pages[page_key(url)] = (url, None, fingerprint)
+
+    feeds = {
+        reverse("blog_1:post_feed"): home,
+        reverse("blog_1:post_atom_feed"): home,
+    }
+    for slug in published_tags:
+        listing = reverse("blog_1:post_list_by_tag", args=[slug])
+        feeds[reverse("blog_1:tag_feed", args=[slug])] = listing
+        feeds[reverse("blog_1:tag_atom_feed", args=[slug])] = listing
+    for feed, listing in feeds.items():
+        pages[feed] = (feed, None, _fingerprint(listed[listing][:FEED_ITEMS]))
+    sitemap = reverse("sitemap")
+    pages[sitemap] = (sitemap, None, _fingerprint(listed[home]))
+    return pages
+
+
+def _init_worker():
+    # Spawned workers start from scratch; forked ones already are set up
+    django.setup()
+
+
+def _file_name(url, page, content_type):
+    if not url.endswith("/"):
+        return url.lstrip("/")
+    name = "index.xml" if "xml" in content_type else f"index{page or ''}.html"
+    return f"{url.lstrip('/')}{name}"
+
+
+def _write(path, content):
+    # Replace atomically so nginx never serves a half-written page
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{os.getpid()}")
+    partial.write_bytes(content)
+    os.replace(partial, path)
+
+
+def render_page(directory, scheme, url, page):
+    """
+    Render ``url`` (?page=``page``) into ``directory``; returns its file name
+    relative to ``directory``, or the HTTP status if it didn't render
+    """
+    domain = Site.objects.get_current().domain
+    factory = RequestFactory(SERVER_NAME=domain)
+    request = factory.get(url, {"page": page} if page else {}, secure=scheme == "https")
+    request.user = AnonymousUser()
+    request.page_cache_holes = True
+    match = resolve(url)
+    # The bare view, without the HTTP and page caches around it
+    view = inspect.unwrap(match.func)
+    response = view(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        return response.status_code
+    if hasattr(response, "render"):
+        response.render()
+    if response.streaming:
+        content = b"".join(response.streaming_content).decode(response.charset)
+    else:
+        content = response.content.decode(response.charset)
+    content = punch_holes(content)
+    content = content.replace(SIDEBAR_HOLE, SSI_INCLUDE.format(f"/{SIDEBAR_FILE}"))
+    content = content.replace(
+        CSRF_HOLE, SSI_INCLUDE.format(reverse("blog_1:csrf_token"))
+    )
+    name = _file_name(url, page, response["Content-Type"])
+    _write(Path(directory) / name, content.encode(response.charset))
+    return name
+
+
+def _load_manifest(directory):
+    try:
+        return json.loads((directory / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def export(directory, workers=1, full=False, scheme="https"):
+    """
+    Bring the static export in ``directory`` up to date; returns the page
+    keys rendered, removed and failed (with their HTTP status)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(directory)
+    pages = plan()
+    stale = [
+        (key, url, page)
+        for key, (url, page, fingerprint) in pages.items()
+        if full or manifest.get(key, {}).get("fingerprint") != fingerprint
+    ]
+
+    jobs = [(str(directory), scheme, url, page) for key, url, page in stale]
+    if workers > 1 and jobs:
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            results = list(pool.map(render_page, *zip(*jobs), chunksize=16))
+    else:
+        results = [render_page(*job) for job in jobs]
+
+    rendered, failed = [], {}
+    for (key, url, page), result in zip(stale, results):
+        if isinstance(result, int):
+            failed[key] = result
+            if key in manifest:
+                (directory / manifest.pop(key)["file"]).unlink(missing_ok=True)
+        else:
+            rendered.append(key)
+            manifest[key] = {"file": result, "fingerprint": pages[key][2]}
+
+    removed = [key for key in manifest if key not in pages]
+    for key in removed:
+        (directory / manifest.pop(key)["file"]).unlink(missing_ok=True)
+
+    sidebar = render_to_string("blog/sidebar.html").encode()
+    sidebar_path = directory / SIDEBAR_FILE
+    if not sidebar_path.exists() or sidebar_path.read_bytes() != sidebar:
+        _write(sidebar_path, sidebar)
+    _write(directory / MANIFEST, json.dumps(manifest, indent=1).encode())
+    return rendered, removed, failed
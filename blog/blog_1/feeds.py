@@ -1,30 +1,106 @@
-import markdown
+"""
+RSS and Atom feeds of the latest posts, site-wide and per tag.
 
-from django.contrib.syndication.views import Feed
+Feed readers poll these every few minutes, so the generated XML is cached
+per URL, keyed by the site validators (see http_cache.py), which move
+whenever a post is published or updated. A poll is answered from that
+cache, and a conditional poll with a 304 from the validators alone
+(``http_cache`` in urls.py).
+"""
+
+import hashlib
 
-from django.template.defaultfilters import truncatewords_html
+from django.contrib.sites.shortcuts import get_current_site
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from taggit.models import Tag
 
-from django.urls import reverse_lazy
+from .http_cache import validators
 from .models import Post
 
+FEED_ITEMS = 5
+FEED_KEY = "blog:feed:{}"
+# Keys change with the validators; this only bounds their lifetime
+FEED_TIMEOUT = 3600
+
+
+class CachedFeed(Feed):
+    """A feed whose XML is rendered once per change of the blog"""
 
-class LatestPostsFeed(Feed):
+    def __call__(self, request, *args, **kwargs):
+        domain = get_current_site(request).domain
+        location = f"{request.scheme}://{domain}{request.get_full_path()}"
+        version = f"{location}:{validators()[1]}"
+        key = FEED_KEY.format(hashlib.md5(version.encode()).hexdigest())
+        cached = cache.get(key)
+        if cached is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+        response = super().__call__(request, *args, **kwargs)
+        # Last-Modified comes from the site validators, like the ETag
+        response.headers.pop("Last-Modified", None)
+        cache.set(key, (response["Content-Type"], response.content), FEED_TIMEOUT)
+        return response
+
+
+class LatestPostsFeed(CachedFeed):
     title = "My blog"
     link = reverse_lazy("blog_1:post_lists")
     description = "New posts of my blog"
 
-    def items(self):
-        return Post.published.all()[:5]
+    def posts(self, obj):
+        return Post.published.all()
+
+    def items(self, obj):
+        return self.posts(obj).only(
+            "title", "excerpt_html", "publish", "updated", "url_path"
+        )[:FEED_ITEMS]
 
     def item_title(self, item):
         return item.title
 
     def item_description(self, item):
-        return truncatewords_html(markdown.markdown(item.body), 30)
+        return item.excerpt_html
 
     def item_pubdate(self, item):
         return item.publish
 
+    def item_updateddate(self, item):
+        return item.updated
+
     def item_link(self, item):
         """Use the post's get_absolute_url (uses blog_1:post_detail)."""
         return item.get_absolute_url()
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class TagPostsFeed(LatestPostsFeed):
+    def get_object(self, request, tag_slug):
+        return get_object_or_404(Tag, slug=tag_slug)
+
+    def posts(self, obj):
+        return Post.published.filter(tags__in=[obj])
+
+    def title(self, obj):
+        return f'My blog: posts tagged with "{obj.name}"'
+
+    def link(self, obj):
+        return reverse("blog_1:post_list_by_tag", args=[obj.slug])
+
+    def description(self, obj):
+        return f'New posts of my blog tagged with "{obj.name}"'
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
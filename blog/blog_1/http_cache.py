@@ -0,0 +1,171 @@
+"""
+HTTP validators and cache headers for blog pages, the feed and the sitemap.
+
+Every page shows the sidebar (latest and most commented posts), so any post,
+comment or tag change can change any page and the validators are site-wide:
+the newest ``Post.updated``, published ``publish`` and ``Comment.updated``,
+plus counts and the page cache's listing generation, which also move on
+deletions and tag changes. They are computed once and cached until the next
+change, so ``http_cache`` answers If-None-Match / If-Modified-Since with a
+304 before the view (or its page cache) runs.
+
+Public pages (post lists, the feed, the sitemap) may be kept by the nginx
+``proxy_cache`` in front of Django (nginx/nginx.conf) for PROXY_CACHE_TIMEOUT
+seconds, set through ``X-Accel-Expires`` so browsers still revalidate. When a
+post is published, changed or unpublished, its list, tag, feed and sitemap
+URLs are purged from nginx if PAGE_PURGE_URL is set; other list pages
+(``?page=N``) simply expire. Pages with a comment form carry the visitor's
+CSRF token and are only cached, and revalidated, by the visitor's browser.
+"""
+
+import hashlib
+import logging
+import urllib.request
+from functools import wraps
+from urllib.error import HTTPError, URLError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .caching import LISTING, generation
+from .models import Comment, Post
+from .sitemaps import section_of
+
+logger = logging.getLogger(__name__)
+
+VALIDATORS_KEY = "blog:validators"
+# Changes invalidate the validators right away; this only bounds their lifetime
+VALIDATORS_TIMEOUT = 3600
+PROXY_CACHE_TIMEOUT = 300
+PURGE_TIMEOUT = 2
+
+
+def _compute_validators():
+    posts = Post.objects.aggregate(
+        last_update=Max("updated"),
+        last_publish=Max("publish", filter=Q(status=Post.Status.PUBLISH)),
+        total=Count("pk"),
+        active_comments=Sum("comment_count"),
+    )
+    comments = Comment.objects.aggregate(last_update=Max("updated"), total=Count("pk"))
+    # Bumped by tag changes and deletions, which leave no timestamp behind
+    listing = generation(LISTING)
+    stamps = [posts["last_update"], posts["last_publish"], comments["last_update"]]
+    last_modified = max((stamp for stamp in stamps if stamp), default=None)
+    state = repr((sorted(posts.items()), sorted(comments.items()), listing))
+    return last_modified, hashlib.md5(state.encode()).hexdigest()
+
+
+def validators():
+    """(Last-Modified, ETag) of every blog page"""
+    return cache.get_or_compute(
+        VALIDATORS_KEY, _compute_validators, timeout=VALIDATORS_TIMEOUT
+    )
+
+
+def invalidate_validators(*args, **kwargs):
+    # Signal handler for anything that shows up on a page
+    transaction.on_commit(lambda: cache.delete(VALIDATORS_KEY))
+
+
+def _etag(request, *args, **kwargs):
+    # Pages differ per user (admin links, the comment form's token)
+    user = request.user.pk or ""
+    return hashlib.md5(f"{validators()[1]}:{user}".encode()).hexdigest()
+
+
+def _last_modified(request, *args, **kwargs):
+    # An anonymous copy must not look fresh to a user who has since logged in
+    if request.user.is_authenticated:
+        return None
+    return validators()[0]
+
+
+def http_cache(public=True):
+    """
+    Answer conditional GETs from the site-wide validators and set the cache
+    headers: ``public`` pages of anonymous visitors may also be kept by nginx.
+    """
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=_etag, last_modified_func=_last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                return response
+            if public and not request.user.is_authenticated:
+                patch_cache_control(response, public=True, no_cache=True)
+                response["X-Accel-Expires"] = PROXY_CACHE_TIMEOUT
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def purge(paths):
+    """Drop ``paths`` from the nginx cache through PAGE_PURGE_URL"""
+    base = settings.PAGE_PURGE_URL.rstrip("/")
+    if not base:
+        return
+    for path in paths:
+        request = urllib.request.Request(f"{base}{path}", method="PURGE")
+        try:
+            urllib.request.urlopen(request, timeout=PURGE_TIMEOUT).close()
+        except HTTPError as error:
+            # 404: the page wasn't cached
+            if error.code != 404:
+                logger.warning("Purging %s failed: HTTP %s", path, error.code)
+        except (URLError, OSError) as error:
+            # The proxy is down or unreachable; don't wait on it for every path
+            logger.warning("Purging %s failed: %s", path, error)
+            return
+
+
+def public_paths(post):
+    """The proxy-cached URLs that show ``post``"""
+    return [
+        reverse("blog_1:post_lists"),
+        *(
+            reverse(name, args=[slug])
+            for slug in post.tags.values_list("slug", flat=True)
+            for name in (
+                "blog_1:post_list_by_tag",
+                "blog_1:tag_feed",
+                "blog_1:tag_atom_feed",
+            )
+        ),
+        reverse("blog_1:post_feed"),
+        reverse("blog_1:post_atom_feed"),
+        reverse("sitemap"),
+        reverse("sitemap_section", args=[section_of(post.publish)]),
+    ]
+
+
+def _schedule_purge(post):
+    if settings.PAGE_PURGE_URL:
+        paths = public_paths(post)
+        transaction.on_commit(lambda: purge(paths))
+
+
+def on_post_saved(sender, instance, created, raw=False, **kwargs):
+    # _saved_status is set by similarity.on_post_pre_save
+    was_published = getattr(instance, "_saved_status", None) == Post.Status.PUBLISH
+    if not raw and (instance.status == Post.Status.PUBLISH or was_published):
+        _schedule_purge(instance)
+
+
+def on_post_pre_delete(sender, instance, **kwargs):
+    if instance.status == Post.Status.PUBLISH:
+        _schedule_purge(instance)
@@ -0,0 +1,136 @@
+"""
+Outgoing email queue.
+
+Views don't talk to the SMTP server: ``enqueue`` stores the message as an
+OutgoingEmail row and returns. ``manage.py send_queued_mail`` (a long
+running worker, or ``--once`` from cron) claims due messages in batches and
+sends them over one SMTP connection, which it keeps open while there is
+mail to send. Failures are retried with exponential backoff; permanent
+SMTP errors (5xx) and messages out of attempts are marked FAILED.
+
+Claiming a message leases it for LEASE seconds by moving its
+next_attempt_at ahead, under ``select_for_update(skip_locked=True)`` so
+concurrent workers never claim the same message. A worker that dies
+mid-batch leaves its messages to be retried once the lease runs out, so
+delivery is at-least-once.
+"""
+
+import logging
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+# Seconds before the first retry, doubled for every later one
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 6 * 3600
+LEASE = 600
+
+
+def enqueue(subject, message, recipient_list, from_email=None):
+    """Queue an email for the mail worker, like send_mail() would send it"""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    # Jitter, so messages that failed together aren't retried together
+    return timedelta(seconds=delay * random.uniform(1, 1.1))
+
+
+def is_permanent(error):
+    """Whether retrying ``error`` is pointless (the server said 5xx)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    # Bad credentials are our problem, not the message's
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` due messages to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            attempts=F("attempts") + 1, next_attempt_at=now + timedelta(seconds=LEASE)
+        )
+    for email in batch:
+        email.attempts += 1
+    return batch
+
+
+class Sender:
+    """Sends claimed batches over one connection, reopened after errors"""
+
+    def __init__(self, connection=None):
+        self.connection = connection or get_connection(fail_silently=False)
+
+    def close(self):
+        try:
+            self.connection.close()
+        except (smtplib.SMTPException, OSError):
+            # A broken session; the backend forgets it either way
+            pass
+
+    def send_batch(self, batch_size=BATCH_SIZE):
+        """Claim and send one batch; returns its messages with their new status"""
+        batch = claim(batch_size)
+        for index, email in enumerate(batch):
+            try:
+                # A no-op while open, and then send_messages() leaves it open
+                self.connection.open()
+            except (smtplib.SMTPException, OSError) as error:
+                # No server to talk to: retry the rest of the batch later
+                for unsent in batch[index:]:
+                    self._failed(unsent, error)
+                break
+            try:
+                self.connection.send_messages([email.message(self.connection)])
+            except (
+                smtplib.SMTPRecipientsRefused,
+                smtplib.SMTPSenderRefused,
+                smtplib.SMTPDataError,
+            ) as error:
+                # Refused by the server, which leaves the session usable
+                self._failed(email, error)
+            except (smtplib.SMTPException, OSError) as error:
+                self._failed(email, error)
+                self.close()
+            else:
+                email.status = OutgoingEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ""
+                email.save(update_fields=["status", "sent_at", "last_error"])
+        return batch
+
+    def _failed(self, email, error):
+        email.last_error = f"{type(error).__name__}: {error}"
+        if is_permanent(error) or email.attempts >= MAX_ATTEMPTS:
+            email.status = OutgoingEmail.Status.FAILED
+            logger.error("Giving up on email %s: %s", email.pk, email.last_error)
+        else:
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+            logger.warning("Email %s will be retried: %s", email.pk, email.last_error)
+        email.save(update_fields=["status", "next_attempt_at", "last_error"])
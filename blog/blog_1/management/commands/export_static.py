@@ -0,0 +1,51 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_1.export import export
+
+
+class Command(BaseCommand):
+    help = "Render the published blog into a directory for nginx to serve"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.STATIC_EXPORT_DIR,
+            help="Export directory (default: STATIC_EXPORT_DIR)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Rendering processes (default: one per CPU)",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-render every page, not just the ones that changed",
+        )
+        parser.add_argument(
+            "--scheme",
+            choices=["http", "https"],
+            default="https",
+            help="Scheme of the absolute URLs in the feed and sitemap (default: https)",
+        )
+
+    def handle(self, *args, **options):
+        rendered, removed, failed = export(
+            options["output"],
+            workers=options["workers"],
+            full=options["full"],
+            scheme=options["scheme"],
+        )
+        for key, status in failed.items():
+            self.stderr.write(f"Failed: {key} (HTTP {status})")
+        if failed:
+            raise CommandError(f"{len(failed)} page(s) did not render")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {len(rendered)} page(s), removed {len(removed)}"
+            )
+        )
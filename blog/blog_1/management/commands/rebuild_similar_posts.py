@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog_1.models import Post
+from blog_1.similarity import refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute the similar posts of every post"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Posts recomputed per transaction (default: 200)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        post_ids = list(Post.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(post_ids), batch_size):
+            refresh(post_ids[start : start + batch_size])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt similar posts for {len(post_ids)} post(s)")
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_1.models import Post
+from blog_1.rendering import backfill, is_stale
+
+
+class Command(BaseCommand):
+    help = "Render post bodies whose stored HTML is missing or out of date"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report posts whose HTML does not match their body; fails if any",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-render every post")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Posts rendered per query (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            posts = Post.objects.only("pk", "title", "body", "body_hash")
+            stale = [post for post in posts.iterator() if is_stale(post)]
+            for post in stale:
+                self.stdout.write(f"Stale: {post.pk} {post.title}")
+            if stale:
+                raise CommandError(
+                    f"{len(stale)} post(s) need rendering; run render_posts"
+                )
+            self.stdout.write("All posts are rendered")
+            return
+
+        updated = backfill(
+            Post.objects.all(), force=options["force"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rendered {updated} post(s)"))
@@ -0,0 +1,56 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from blog_1.mail import BATCH_SIZE, Sender
+from blog_1.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = "Send queued emails (see blog_1/mail.py), polling for new ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send what is due now and exit instead of polling",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Messages claimed at a time (default: {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls of an empty queue (default: 5)",
+        )
+
+    def handle(self, *args, **options):
+        sender = Sender()
+        totals = Counter()
+        try:
+            while True:
+                batch = sender.send_batch(options["batch_size"])
+                totals.update(email.status for email in batch)
+                if batch:
+                    continue
+                # Don't hold an idle connection open between polls
+                sender.close()
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.close()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {totals[OutgoingEmail.Status.SENT]}, "
+                f"retrying {totals[OutgoingEmail.Status.PENDING]}, "
+                f"failed {totals[OutgoingEmail.Status.FAILED]}"
+            )
+        )
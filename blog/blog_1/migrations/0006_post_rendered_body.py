@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+def render_existing_posts(apps, schema_editor):
+    from blog_1.rendering import backfill
+
+    Post = apps.get_model('blog_1', 'Post')
+    backfill(Post.objects.using(schema_editor.connection.alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0005_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='body_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model('blog_1', 'Post')
+    Comment = apps.get_model('blog_1', 'Comment')
+    active = (
+        Comment.objects.filter(post=OuterRef('pk'), active=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Post.objects.using(schema_editor.connection.alias).update(
+        comment_count=Coalesce(Subquery(active), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0006_post_rendered_body'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-comment_count', '-publish'], name='blog_1_post_comment_count_idx'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    Post = apps.get_model('blog_1', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(
+        search_vector=SearchVector('title', weight='A', config='english')
+        + SearchVector('body', weight='B', config='english')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0008_similar_posts'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        # After the backfill, so the index is built once
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_1_post_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0009_post_search_vector'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('title'), name='text_pattern_ops'), name='blog_1_post_title_prefix_idx'),
+        ),
+        # taggit's Tag is not ours to add Meta.indexes to: prefix and
+        # trigram indexes for tag suggestions
+        migrations.RunSQL(
+            [
+                'CREATE INDEX IF NOT EXISTS blog_1_tag_name_prefix_idx ON taggit_tag (lower(name) text_pattern_ops)',
+                'CREATE INDEX IF NOT EXISTS blog_1_tag_name_trgm_idx ON taggit_tag USING gin (name gin_trgm_ops)',
+            ],
+            [
+                'DROP INDEX IF EXISTS blog_1_tag_name_trgm_idx',
+                'DROP INDEX IF EXISTS blog_1_tag_name_prefix_idx',
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.urls import reverse
+from django.utils import timezone
+
+
+def store_url_paths(apps, schema_editor):
+    Post = apps.get_model('blog_1', 'Post')
+    posts = list(Post.objects.using(schema_editor.connection.alias).only('pk', 'slug', 'publish'))
+    for post in posts:
+        publish = timezone.localtime(post.publish)
+        post.url_path = reverse(
+            'blog_1:post_detail', args=[publish.year, publish.month, publish.day, post.slug]
+        )
+    Post.objects.using(schema_editor.connection.alias).bulk_update(posts, ['url_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0010_suggestion_indexes'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='url_path',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.RunPython(store_url_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['slug', 'publish'], name='blog_1_post_slug_publish_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog_1', '0011_post_url_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=500)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=320)),
+                ('recipients', models.JSONField()),
+                ('status', models.CharField(choices=[('PD', 'PENDING'), ('ST', 'SENT'), ('FL', 'FAILED')], default='PD', max_length=2)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PD')), fields=['next_attempt_at'], name='blog_1_email_queue_idx')],
+            },
+        ),
+    ]
@@ -4,10 +4,16 @@ from django.db import models
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models.functions import Lower
 from django.urls import reverse
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 
 from taggit.managers import TaggableManager
 
+from . import rendering
+
 
 class PublishedManager(models.Manager):
     def get_queryset(self):
@@ -27,6 +33,10 @@ class Post(models.Model):
         related_name="blog_posts",
     )
     body = models.TextField()
+    # Rendered from body on save (see rendering.py)
+    body_html = models.TextField(blank=True, editable=False)
+    excerpt_html = models.TextField(blank=True, editable=False)
+    body_hash = models.CharField(max_length=64, blank=True, editable=False)
     publish = models.DateTimeField(default=timezone.now)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
@@ -35,6 +45,12 @@ class Post(models.Model):
         choices=Status.choices,
         default=Status.DRAFT,
     )
+    # Weighted title + body vector, refreshed on save (see search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # get_absolute_url(), stored on save so listing posts reverses no URLs
+    url_path = models.CharField(max_length=300, blank=True, editable=False)
+    # Active comments, maintained by the handlers in counters.py
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     objects = models.Manager()
     published = PublishedManager()
     tags = TaggableManager()
@@ -43,17 +59,87 @@ class Post(models.Model):
         ordering = ["-publish"]
         indexes = [
             models.Index(fields=["-publish"]),
+            # Admin changelist ordering
+            models.Index(fields=["status", "publish"]),
+            # post_detail: slug plus a one-day publish range
+            models.Index(
+                fields=["slug", "publish"], name="blog_1_post_slug_publish_idx"
+            ),
+            # Most commented posts in the sidebar
+            models.Index(
+                fields=["status", "-comment_count", "-publish"],
+                name="blog_1_post_comment_count_idx",
+            ),
+            # Trigram GIN index for the admin's icontains search
+            GinIndex(
+                fields=["title", "body"],
+                name="blog_1_post_search_trgm",
+                opclasses=["gin_trgm_ops", "gin_trgm_ops"],
+            ),
+            GinIndex(fields=["search_vector"], name="blog_1_post_search_vector_idx"),
+            # Title prefix lookups for search suggestions
+            models.Index(
+                OpClass(Lower("title"), name="text_pattern_ops"),
+                name="blog_1_post_title_prefix_idx",
+            ),
         ]
 
     def __str__(self):
         return self.title
 
-    def get_absolute_url(self):
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        derived = set()
+        # Only re-render when the body actually changed
+        if rendering.is_stale(self):
+            rendering.render(self)
+            derived.update(rendering.RENDERED_FIELDS)
+        url_path = self.build_url_path()
+        if url_path != self.url_path:
+            self.url_path = url_path
+            derived.add("url_path")
+        if update_fields is not None and derived:
+            kwargs["update_fields"] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"title", "body"} & set(update_fields):
+            from .search import update_search_vector
+
+            update_search_vector([self.pk])
+
+    def build_url_path(self):
+        publish = timezone.localtime(self.publish)
         return reverse(
             "blog_1:post_detail",
-            args=[self.publish.year, self.publish.month, self.publish.day, self.slug],
+            args=[publish.year, publish.month, publish.day, self.slug],
         )
 
+    def get_absolute_url(self):
+        return self.url_path or self.build_url_path()
+
+
+class SimilarPost(models.Model):
+    """A post's ``rank``-th most similar post by shared tags (see similarity.py)"""
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="similar_posts"
+    )
+    similar = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    shared_tags = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["post_id", "rank"]
+        constraints = [
+            # Also the index post_detail reads a post's list with
+            models.UniqueConstraint(
+                fields=["post", "rank"], name="blog_1_similar_post_rank_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.similar_id} ({self.shared_tags} tags)"
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
@@ -68,10 +154,63 @@ class Comment(models.Model):
         ordering = ["created"]
         indexes = [
             models.Index(fields=["created"]),
+            GinIndex(
+                fields=["name", "email", "body"],
+                name="blog_1_comment_search_trgm",
+                opclasses=["gin_trgm_ops", "gin_trgm_ops", "gin_trgm_ops"],
+            ),
         ]
 
     def __str__(self):
         return f"Comment by {self.name} on {self.post}"
 
 
+class OutgoingEmail(models.Model):
+    """An email queued for the mail worker (see mail.py)"""
+
+    class Status(models.TextChoices):
+        PENDING = "PD", "PENDING"
+        SENT = "ST", "SENT"
+        FAILED = "FL", "FAILED"
+
+    subject = models.CharField(max_length=500)
+    body = models.TextField()
+    from_email = models.CharField(max_length=320)
+    recipients = models.JSONField()
+    status = models.CharField(
+        max_length=2,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the worker may (re)try it; pushed ahead while a worker holds it
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [
+            # The worker's queue: pending messages that are due
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="PD"),
+                name="blog_1_email_queue_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)}"
+
+    def message(self, connection=None):
+        return EmailMessage(
+            self.subject,
+            self.body,
+            self.from_email,
+            self.recipients,
+            connection=connection,
+        )
+
+
 # email =
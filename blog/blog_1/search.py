@@ -0,0 +1,123 @@
+"""
+Full-text search over published posts, and search-as-you-type suggestions.
+
+Each post stores its search vector (title weighted A, body B) in
+``Post.search_vector``, refreshed on save and covered by a GIN index, so a
+search is an index scan plus ranking of the matches. Headlines are the
+expensive part and are only computed for the page being shown.
+
+Suggestions match post titles and tag names by prefix (expression indexes on
+``lower(...)`` with pattern ops) and fall back to trigram word similarity
+for typos and words inside titles. Results are cached per normalized prefix
+in a small per-process cache, so hot prefixes never reach the database.
+"""
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.core.cache import caches
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.urls import reverse
+from taggit.models import Tag
+
+from .models import Post
+
+# Must match the config the stored vectors were built with
+SEARCH_CONFIG = "english"
+RESULTS_PER_PAGE = 10
+SUGGESTIONS = 5
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LENGTH = 100
+
+
+def search_vector():
+    """The expression stored in Post.search_vector"""
+    return SearchVector("title", weight="A", config=SEARCH_CONFIG) + SearchVector(
+        "body", weight="B", config=SEARCH_CONFIG
+    )
+
+
+def update_search_vector(post_ids):
+    Post.objects.filter(pk__in=post_ids).update(search_vector=search_vector())
+
+
+def search(query):
+    """Published posts matching ``query``, best match first"""
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    return (
+        Post.published.filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by("-rank", "-publish")
+        .defer("body", "body_html", "search_vector")
+    )
+
+
+def add_headlines(posts, query):
+    """Set ``headline``, a body snippet with the matches marked, on ``posts``"""
+    headlines = dict(
+        Post.objects.filter(pk__in=[post.pk for post in posts])
+        .annotate(
+            headline=SearchHeadline(
+                "body",
+                SearchQuery(query, config=SEARCH_CONFIG),
+                config=SEARCH_CONFIG,
+                start_sel="<mark>",
+                stop_sel="</mark>",
+                max_words=35,
+                min_words=15,
+            )
+        )
+        .values_list("pk", "headline")
+    )
+    for post in posts:
+        post.headline = headlines.get(post.pk, "")
+    return posts
+
+
+def _matches(queryset, field, prefix):
+    """Up to SUGGESTIONS rows whose ``field`` starts with ``prefix``, then similar ones"""
+    matches = list(
+        queryset.alias(lowered=Lower(field))
+        .filter(lowered__startswith=prefix)
+        .order_by("lowered")[:SUGGESTIONS]
+    )
+    if len(matches) < SUGGESTIONS and len(prefix) >= 3:
+        similar = (
+            queryset.filter(**{f"{field}__trigram_word_similar": prefix})
+            .exclude(pk__in=[match.pk for match in matches])
+            .annotate(similarity=TrigramWordSimilarity(prefix, field))
+            .order_by("-similarity")
+        )
+        matches += similar[: SUGGESTIONS - len(matches)]
+    return matches
+
+
+def suggest(prefix):
+    """Post titles and tags matching what has been typed so far"""
+    prefix = " ".join(prefix.lower().split())[:SUGGEST_MAX_LENGTH]
+    if len(prefix) < SUGGEST_MIN_LENGTH:
+        return {"posts": [], "tags": []}
+    cache = caches["suggestions"]
+    suggestions = cache.get(prefix)
+    if suggestions is None:
+        posts = _matches(Post.published.only("title", "url_path"), "title", prefix)
+        tags = _matches(Tag.objects.all(), "name", prefix)
+        suggestions = {
+            "posts": [
+                {"title": post.title, "url": post.get_absolute_url()} for post in posts
+            ],
+            "tags": [
+                {
+                    "name": tag.name,
+                    "url": reverse("blog_1:post_list_by_tag", args=[tag.slug]),
+                }
+                for tag in tags
+            ],
+        }
+        cache.set(prefix, suggestions)
+    return suggestions
@@ -0,0 +1,102 @@
+"""
+Precomputed similar posts.
+
+For every published post, SimilarPost holds its SIMILAR_POSTS published
+posts sharing the most tags (newest first on ties), so post_detail reads
+them with one indexed lookup instead of joining taggit's tables.
+
+A post's list can only change when its own tags or status change or when a
+post sharing one of its tags does, so the handlers below re-rank just that
+neighbourhood after the transaction commits. ``manage.py
+rebuild_similar_posts`` recomputes everything, e.g. after bulk tag edits
+that send no signals.
+"""
+
+from django.db import transaction
+from django.db.models import Count
+
+from .caching import invalidate_pages
+from .models import Post, SimilarPost
+
+SIMILAR_POSTS = 4
+
+
+def tags_of(post_id):
+    return Post.objects.filter(pk=post_id).values("tags")
+
+
+def rank_similar(post_id):
+    """(post id, shared tags) of the posts most similar to ``post_id``"""
+    return list(
+        Post.published.filter(tags__in=tags_of(post_id))
+        .exclude(pk=post_id)
+        .annotate(same_tags=Count("tags"))
+        .order_by("-same_tags", "-publish")
+        .values_list("pk", "same_tags")[:SIMILAR_POSTS]
+    )
+
+
+def refresh(post_ids):
+    """Recompute the similar posts of ``post_ids``"""
+    post_ids = set(post_ids)
+    published = Post.published.filter(pk__in=post_ids).values_list("pk", flat=True)
+    rows = [
+        SimilarPost(
+            post_id=post_id, similar_id=similar_id, shared_tags=shared, rank=rank
+        )
+        for post_id in published
+        for rank, (similar_id, shared) in enumerate(rank_similar(post_id))
+    ]
+    with transaction.atomic():
+        SimilarPost.objects.filter(post_id__in=post_ids).delete()
+        SimilarPost.objects.bulk_create(rows)
+        invalidate_pages(*(f"post:{post_id}" for post_id in post_ids))
+
+
+def neighbours(post_id, tag_ids=None):
+    """
+    ``post_id`` and the posts sharing any of ``tag_ids`` (default: the
+    post's current tags) with it
+    """
+    if tag_ids is None:
+        tag_ids = tags_of(post_id)
+    return {
+        post_id,
+        *Post.objects.filter(tags__in=tag_ids).values_list("pk", flat=True),
+    }
+
+
+def schedule_refresh(post_ids):
+    transaction.on_commit(lambda: refresh(post_ids))
+
+
+def on_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse or not isinstance(instance, Post):
+        return
+    # Before removal the old tags still reach the posts that may lose this one
+    if action in ("pre_remove", "post_add"):
+        schedule_refresh(neighbours(instance.pk, pk_set))
+    elif action == "pre_clear":
+        schedule_refresh(neighbours(instance.pk))
+
+
+def on_post_pre_save(sender, instance, raw=False, **kwargs):
+    instance._saved_status = None
+    if instance.pk is not None and not raw:
+        instance._saved_status = (
+            Post.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+        )
+
+
+def on_post_saved(sender, instance, created, raw=False, **kwargs):
+    # New posts have no tags yet; their tags are added (and handled) later
+    if (
+        not raw
+        and not created
+        and instance.status != getattr(instance, "_saved_status", None)
+    ):
+        schedule_refresh(neighbours(instance.pk))
+
+
+def on_post_pre_delete(sender, instance, **kwargs):
+    schedule_refresh(neighbours(instance.pk) - {instance.pk})
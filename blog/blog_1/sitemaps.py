@@ -1,14 +1,217 @@
-from django.contrib.sitemaps import Sitemap
+"""
+Sitemap index with one sitemap per month of posts, plus one of tag pages.
 
+``/sitemap.xml`` lists the sections: ``posts-<year>-<month>``, split into
+pages of SITEMAP_LIMIT URLs (``posts-2025-03-2``, ...) for busy months, and
+``tags``. Every document is written straight from ``values_list()`` rows
+read with ``iterator()`` into a streamed response, so generating one takes
+the same memory however large the blog is, and is cached once complete.
+
+A cached section stays valid until a post in it changes: each section has
+a dependency key in the page cache's generations (see caching.py), which
+the handlers below bump when a published post is saved, moved to another
+month, unpublished or deleted.
+"""
+
+import re
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .caching import generation, invalidate_pages
 from .models import Post
 
+# URLs per sitemap file, the protocol's limit
+SITEMAP_LIMIT = 50000
+SITEMAP_KEY = "blog:sitemap:{}:{}:{}"
+# Sections are invalidated through their dependency keys; this bounds their lifetime
+SITEMAP_TIMEOUT = 86400
+CHUNK_SIZE = 2000
+INDEX = "sitemap"
+TAGS = "tags"
+SECTION = re.compile(r"posts-(\d{4})-(\d{2})(?:-(\d+))?|tags")
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAPINDEX = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def section_of(publish):
+    publish = timezone.localtime(publish)
+    return f"posts-{publish.year}-{publish.month:02d}"
+
+
+def _dependency(section):
+    # Every page of a month shares the month's key
+    return f"sitemap:{section}"
+
+
+def _w3c(moment):
+    return moment.replace(microsecond=0).isoformat()
+
+
+def _month(year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        return start, timezone.make_aware(datetime(year + 1, 1, 1))
+    return start, timezone.make_aware(datetime(year, month + 1, 1))
+
+
+def _chunked(lines):
+    """Join ``lines`` into CHUNK_SIZE-line chunks for the response"""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def _cached_stream(key, chunks):
+    """Pass ``chunks`` through, caching the whole document once it is complete"""
+    document = []
+    for chunk in chunks:
+        document.append(chunk)
+        yield chunk
+    cache.set(key, "".join(document), SITEMAP_TIMEOUT)
+
+
+def _respond(request, name, dependency, lines):
+    key = SITEMAP_KEY.format(request.scheme, name, generation(dependency))
+    document = cache.get(key)
+    if document is not None:
+        return HttpResponse(document, content_type="application/xml")
+    return StreamingHttpResponse(
+        _cached_stream(key, _chunked(lines())), content_type="application/xml"
+    )
+
+
+def _index_lines(base):
+    yield XML_HEADER
+    yield SITEMAPINDEX
+    months = (
+        Post.published.annotate(month=TruncMonth("publish"))
+        .values("month")
+        .annotate(total=Count("pk"), lastmod=Max("updated"))
+        .order_by("month")
+    )
+    for month in months.iterator():
+        section = section_of(month["month"])
+        pages = (month["total"] - 1) // SITEMAP_LIMIT + 1
+        for number in range(1, pages + 1):
+            name = section if number == 1 else f"{section}-{number}"
+            location = reverse("sitemap_section", args=[name])
+            yield (
+                f"<sitemap><loc>{base}{location}</loc>"
+                f"<lastmod>{_w3c(month['lastmod'])}</lastmod></sitemap>\n"
+            )
+    location = reverse("sitemap_section", args=[TAGS])
+    yield f"<sitemap><loc>{base}{location}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def _posts_lines(base, year, month, number):
+    start, end = _month(year, month)
+    offset = (number - 1) * SITEMAP_LIMIT
+    posts = (
+        Post.published.filter(publish__gte=start, publish__lt=end)
+        .order_by("publish", "pk")
+        .values_list("url_path", "updated")[offset : offset + SITEMAP_LIMIT]
+    )
+    yield XML_HEADER
+    yield URLSET
+    for url_path, updated in posts.iterator(chunk_size=CHUNK_SIZE):
+        yield (
+            f"<url><loc>{base}{escape(url_path)}</loc>"
+            f"<lastmod>{_w3c(updated)}</lastmod></url>\n"
+        )
+    yield "</urlset>\n"
+
+
+def _tags_lines(base):
+    slugs = (
+        Post.tags.through.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post),
+            object_id__in=Post.published.values("pk"),
+        )
+        .values_list("tag__slug", flat=True)
+        .distinct()
+        .order_by("tag__slug")[:SITEMAP_LIMIT]
+    )
+    yield XML_HEADER
+    yield URLSET
+    for slug in slugs.iterator(chunk_size=CHUNK_SIZE):
+        location = reverse("blog_1:post_list_by_tag", args=[slug])
+        yield f"<url><loc>{base}{escape(location)}</loc></url>\n"
+    yield "</urlset>\n"
+
+
+def _base(request):
+    return f"{request.scheme}://{get_current_site(request).domain}"
+
+
+def sitemap_index(request):
+    base = _base(request)
+    return _respond(request, "index", INDEX, lambda: _index_lines(base))
+
+
+def sitemap_section(request, section):
+    match = SECTION.fullmatch(section)
+    if match is None:
+        raise Http404("No such sitemap")
+    base = _base(request)
+    if section == TAGS:
+        return _respond(request, section, TAGS, lambda: _tags_lines(base))
+    year, month, number = int(match[1]), int(match[2]), int(match[3] or 1)
+    if not 1 <= month <= 12 or number < 1:
+        raise Http404("No such sitemap")
+    return _respond(
+        request,
+        section,
+        _dependency(f"posts-{year}-{month:02d}"),
+        lambda: _posts_lines(base, year, month, number),
+    )
+
+
+def on_post_pre_save(sender, instance, raw=False, **kwargs):
+    # The section the post is listed in now, if any
+    instance._sitemap_section = None
+    if instance.pk is not None and not raw:
+        saved = (
+            Post.published.filter(pk=instance.pk)
+            .values_list("publish", flat=True)
+            .first()
+        )
+        if saved is not None:
+            instance._sitemap_section = section_of(saved)
+
 
-class PostSitemap(Sitemap):
-    changefreq = "weekly"
-    priority = 0.9
+def on_post_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sections = {getattr(instance, "_sitemap_section", None)}
+    if instance.status == Post.Status.PUBLISH:
+        sections.add(section_of(instance.publish))
+    sections.discard(None)
+    if sections:
+        invalidate_pages(INDEX, TAGS, *(_dependency(section) for section in sections))
 
-    def items(self):
-        return Post.published.all()
 
-    def lastmod(self, obj):
-        return obj.publish
+def on_tags_changed(sender, instance, action, reverse, **kwargs):
+    if (
+        not reverse
+        and isinstance(instance, Post)
+        and instance.status == Post.Status.PUBLISH
+        and action in ("post_add", "post_remove", "post_clear")
+    ):
+        invalidate_pages(TAGS)
@@ -1,12 +1,21 @@
 from django import template
 
+from ..caching import SIDEBAR_HOLE, cached_sidebar
 from ..models import Post
-from django.db.models import Count
 from django.utils.safestring import mark_safe
 import markdown
+
 register = template.Library()
 
 
+@register.simple_tag(takes_context=True)
+def sidebar(context):
+    # Cached pages get the sidebar filled in when they are served
+    if getattr(context.get("request"), "page_cache_holes", False):
+        return mark_safe(SIDEBAR_HOLE)
+    return mark_safe(cached_sidebar())
+
+
 @register.simple_tag
 def total_posts():
     return Post.published.count()
@@ -24,10 +33,9 @@ def show_latest_posts(count=5):
 
 @register.simple_tag
 def get_most_commented_posts(count=5):
-    return Post.published.annotate(total_comments=Count("comments")).order_by(
-        "-total_comments"
-    )[:count]
+    return Post.published.order_by("-comment_count", "-publish")[:count]
+
 
-@register.filter(name='markdown')
+@register.filter(name="markdown")
 def markdown_format(text):
-    return mark_safe(markdown.markdown(text))
\ No newline at end of file
+    return mark_safe(markdown.markdown(text))
@@ -1,3 +1,1066 @@
-from django.test import TestCase
+import os
+import re
+import shutil
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail as outbox
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.template import Context, Template
+from django.utils import timezone
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client.parser import text_string_to_metric_families
+
+from myblog.cache import TieredCache
+
+from . import export, mail, search, sitemaps
+from .models import Comment, OutgoingEmail, Post
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Measured post",
+            slug="measured-post",
+            author=author,
+            body="Latency histograms and query counts.",
+            status=Post.Status.PUBLISH,
+        )
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def sample(self, samples, name, **labels):
+        return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_scrape_reports_per_view_metrics(self):
+        before = self.scrape()
+        self.client.get(self.post.get_absolute_url())
+        self.client.get("/blog/search/", {"query": "latency"})
+        after = self.scrape()
+
+        def delta(name, **labels):
+            return self.sample(after, name, **labels) - self.sample(
+                before, name, **labels
+            )
+
+        for view in ("post_detail", "post_search"):
+            self.assertEqual(
+                delta(
+                    "django_http_requests_total", view=view, method="GET", status="200"
+                ),
+                1,
+            )
+            self.assertEqual(
+                delta(
+                    "django_http_request_duration_seconds_count",
+                    view=view,
+                    method="GET",
+                ),
+                1,
+            )
+            self.assertGreater(delta("django_db_queries_per_request_sum", view=view), 0)
+            self.assertGreater(
+                delta("django_http_response_size_bytes_sum", view=view), 0
+            )
+        self.assertEqual(self.sample(after, "django_http_requests_in_flight"), 1)
+
+    def test_cache_hits_and_misses(self):
+        before = self.scrape()
+        cache.set("metrics-test", 1)
+        cache.get("metrics-test")
+        cache.get("metrics-test-missing")
+        after = self.scrape()
+
+        for result in ("hit", "miss"):
+            self.assertEqual(
+                self.sample(after, "django_cache_requests_total", result=result)
+                - self.sample(before, "django_cache_requests_total", result=result),
+                1,
+            )
+
+    def test_scrape_merges_worker_processes(self):
+        worker = (
+            "from myblog import metrics\n"
+            'metrics.REQUESTS.labels("post_detail", "GET", "200").inc(2)\n'
+        )
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": metrics_dir}
+            for _ in range(3):
+                subprocess.run(
+                    [sys.executable, "-c", worker],
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    check=True,
+                )
+            with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": metrics_dir}):
+                samples = self.scrape()
+
+        self.assertEqual(
+            self.sample(
+                samples,
+                "django_http_requests_total",
+                view="post_detail",
+                method="GET",
+                status="200",
+            ),
+            6,
+        )
+
+
+@override_settings(PROFILING_TOKEN="secret-token", PROFILING_INTERVAL=0.001)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.profile_dir = Path(profile_dir.name)
+        settings_override = self.settings(PROFILING_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Profiled post",
+            slug="profiled-post",
+            author=author,
+            body="Where does the time go?",
+            status=Post.Status.PUBLISH,
+        )
+
+    def test_request_with_token_is_profiled(self):
+        response = self.client.get(
+            self.post.get_absolute_url(),
+            headers={"X-Profile": "secret-token", "X-Request-ID": "req-7"},
+        )
+        name = response["X-Profile-Id"]
+        self.assertTrue(name.endswith("-post_detail-req-7"))
+        self.assertTrue((self.profile_dir / f"{name}.folded").exists())
+
+        out = StringIO()
+        call_command("profiles", stdout=out)
+        self.assertIn(name, out.getvalue())
+        call_command("profiles", name, stdout=out)
+        self.assertIn("profile(s)", out.getvalue())
+
+    def test_requests_without_token_are_not_profiled(self):
+        for headers in ({}, {"X-Profile": "wrong-token"}):
+            response = self.client.get(self.post.get_absolute_url(), headers=headers)
+            self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+
+@override_settings(
+    CACHES={
+        "default": settings.CACHES["default"],
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "tiered-tests",
+        },
+    }
+)
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Cached post",
+            slug="cached-post",
+            author=author,
+            body="Sidebars are computed once.",
+            status=Post.Status.PUBLISH,
+        )
+
+    def worker_cache(self, name):
+        """A cache with its own local level, like one worker process"""
+        return TieredCache(f"{self.id()}-{name}", {"OPTIONS": {"SHARED": "shared"}})
+
+    def test_only_one_recomputation_under_contention(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "expensive"
+
+        workers = [self.worker_cache(f"worker-{i}") for i in range(8)]
+        results = []
+        barrier = threading.Barrier(len(workers))
+
+        def request(worker):
+            barrier.wait()
+            results.append(worker.get_or_compute("hot-key", compute, timeout=30))
+
+        threads = [threading.Thread(target=request, args=(w,)) for w in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["expensive"] * len(workers))
+
+    def test_sidebar_is_cached(self):
+        template = Template("{% load blog_tags %}{% sidebar %}")
+        first = template.render(Context())
+        self.assertIn("Cached post", first)
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context()), first)
+
+
+class RenderedBodyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Rendered post",
+            slug="rendered-post",
+            author=self.author,
+            body="Some **bold** words. " + "filler " * 50,
+            status=Post.Status.PUBLISH,
+        )
+
+    def test_html_is_rendered_on_save(self):
+        self.assertIn("<strong>bold</strong>", self.post.body_html)
+        self.assertTrue(self.post.excerpt_html.endswith("…</p>"))
+        self.post.body = "Now *emphasized*"
+        self.post.save(update_fields=["body"])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.body_html, "<p>Now <em>emphasized</em></p>")
+
+    def test_pages_and_feed_do_not_render_markdown(self):
+        with patch("markdown.markdown") as render:
+            for url in ("/blog/", self.post.get_absolute_url(), "/blog/feed/"):
+                response = self.client.get(url)
+                self.assertContains(response, "bold")
+        render.assert_not_called()
+
+    def test_render_posts_backfills_stale_posts(self):
+        Post.objects.filter(pk=self.post.pk).update(body="Changed *behind* save()")
+        with self.assertRaises(CommandError):
+            call_command("render_posts", check=True, stdout=StringIO())
+
+        out = StringIO()
+        call_command("render_posts", stdout=out)
+        self.assertIn("Rendered 1 post(s)", out.getvalue())
+        self.post.refresh_from_db()
+        self.assertIn("<em>behind</em>", self.post.body_html)
+        call_command("render_posts", check=True, stdout=StringIO())
+
+
+class CommentCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username="author", password="password")
+        self.posts = [
+            Post.objects.create(
+                title=f"Post {i}",
+                slug=f"post-{i}",
+                author=author,
+                body="Comment on me.",
+                status=Post.Status.PUBLISH,
+            )
+            for i in range(2)
+        ]
+
+    def comment(self, post, **kwargs):
+        return Comment.objects.create(
+            post=post, name="Reader", email="reader@example.com", body="Hi", **kwargs
+        )
+
+    def counts(self):
+        return [Post.objects.get(pk=post.pk).comment_count for post in self.posts]
+
+    def test_counter_follows_active_comments(self):
+        first, second = self.posts
+        comment = self.comment(first)
+        self.comment(first, active=False)
+        self.assertEqual(self.counts(), [1, 0])
+
+        comment.active = False
+        comment.save()
+        self.assertEqual(self.counts(), [0, 0])
+        comment.active = True
+        comment.save()
+        comment.post = second
+        comment.save()
+        self.assertEqual(self.counts(), [0, 1])
+        comment.delete()
+        self.assertEqual(self.counts(), [0, 0])
+
+    def test_sidebar_is_invalidated_by_new_comments(self):
+        template = Template("{% load blog_tags %}{% sidebar %}")
+        self.assertIn("Post 1</a>", template.render(Context()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/blog/{self.posts[0].id}/comment/",
+                {"name": "Reader", "email": "reader@example.com", "body": "First!"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(), [1, 0])
+        sidebar = template.render(Context())
+        most_commented = sidebar[sidebar.index("Most commented") :]
+        self.assertLess(
+            most_commented.index("Post 0</a>"), most_commented.index("Post 1</a>")
+        )
+        with self.assertNumQueries(0):
+            template.render(Context())
+
+
+class SimilarPostsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password")
+
+    def create_post(self, slug, tags, status=Post.Status.PUBLISH):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title=slug.title(),
+                slug=slug,
+                author=self.author,
+                body="Tagged.",
+                status=status,
+            )
+            post.tags.add(*tags)
+        return post
+
+    def similar(self, post):
+        return [row.similar.slug for row in post.similar_posts.all()]
+
+    def test_similar_posts_follow_tags_and_status(self):
+        django = self.create_post("django", ["python", "web"])
+        flask = self.create_post("flask", ["python", "web"])
+        numpy = self.create_post("numpy", ["python"])
+        draft = self.create_post("draft", ["python", "web"], Post.Status.DRAFT)
+        self.assertEqual(self.similar(django), ["flask", "numpy"])
+        self.assertEqual(self.similar(numpy), ["flask", "django"])
+        self.assertEqual(self.similar(draft), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.status = Post.Status.PUBLISH
+            draft.save()
+        self.assertEqual(self.similar(django), ["draft", "flask", "numpy"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flask.tags.clear()
+        self.assertEqual(self.similar(django), ["draft", "numpy"])
+        self.assertEqual(self.similar(flask), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.delete()
+        self.assertEqual(self.similar(django), ["numpy"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(django.get_absolute_url())
+        self.assertEqual(
+            [post.slug for post in response.context["similar_posts"]], ["numpy"]
+        )
+        tables = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(len([sql for sql in tables if "similarpost" in sql]), 1)
+        self.assertFalse([sql for sql in tables if "taggit" in sql])
+
+    def test_rebuild_command(self):
+        first = self.create_post("first", ["tag"])
+        second = self.create_post("second", ["tag"])
+        first.similar_posts.all().delete()
+        call_command("rebuild_similar_posts", stdout=StringIO())
+        self.assertEqual(self.similar(first), ["second"])
+        self.assertEqual(self.similar(second), ["first"])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username="author", password="password")
+        self.posts = [
+            Post.objects.create(
+                title=f"Indexing post {i}",
+                slug=f"indexing-post-{i}",
+                author=author,
+                body="Postgres uses a GIN index for full-text search. " + "More. " * i,
+                status=Post.Status.PUBLISH,
+            )
+            for i in range(12)
+        ]
+        Post.objects.create(
+            title="Unrelated draft about indexing",
+            slug="draft",
+            author=author,
+            body="Not published.",
+        )
+
+    def test_search_vector_is_stored_and_refreshed(self):
+        post = self.posts[0]
+        self.assertTrue(Post.objects.filter(search_vector="gin").exists())
+        post.body = "Now about sharding."
+        post.save(update_fields=["body"])
+        self.assertTrue(
+            Post.objects.filter(pk=post.pk, search_vector="sharding").exists()
+        )
+
+    def test_title_matches_rank_above_body_matches(self):
+        post = self.posts[3]
+        post.title = "Gardening"
+        post.save()
+        self.posts[5].body = "Gardening tips."
+        self.posts[5].save()
+        self.assertEqual(
+            [p.pk for p in search.search("gardening")], [post.pk, self.posts[5].pk]
+        )
+
+    def test_results_are_paginated_with_headlines(self):
+        response = self.client.get("/blog/search/", {"query": "index"})
+        results = response.context["results"]
+        self.assertEqual(results.paginator.count, 12)
+        self.assertEqual(len(results), search.RESULTS_PER_PAGE)
+        self.assertContains(response, "<mark>index</mark>")
+        self.assertContains(response, "?query=index&amp;page=2")
+
+        response = self.client.get("/blog/search/", {"query": "index", "page": 2})
+        self.assertEqual(len(response.context["results"]), 2)
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        caches["suggestions"].clear()
+        author = User.objects.create_user(username="author", password="password")
+        for title in ("Django signals", "Django admin tricks", "Deploying with Docker"):
+            post = Post.objects.create(
+                title=title,
+                slug=title.lower().replace(" ", "-"),
+                author=author,
+                body="Suggest me.",
+                status=Post.Status.PUBLISH,
+            )
+            post.tags.add("django", "deployment")
+        Post.objects.create(
+            title="Django draft", slug="django-draft", author=author, body="Hidden."
+        )
+
+    def test_prefix_matches_titles_and_tags(self):
+        response = self.client.get("/blog/search/suggest/", {"q": "  DJan"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=60", response["Cache-Control"])
+        data = response.json()
+        self.assertEqual(
+            [post["title"] for post in data["posts"]],
+            ["Django admin tricks", "Django signals"],
+        )
+        self.assertEqual(data["tags"], [{"name": "django", "url": "/blog/tag/django/"}])
+
+    def test_typos_and_inner_words_match_by_similarity(self):
+        data = self.client.get("/blog/search/suggest/", {"q": "dockr"}).json()
+        self.assertEqual(
+            [post["title"] for post in data["posts"]], ["Deploying with Docker"]
+        )
+
+    def test_hot_prefixes_are_served_from_memory(self):
+        self.client.get("/blog/search/suggest/", {"q": "dep"})
+        with self.assertNumQueries(0):
+            data = self.client.get("/blog/search/suggest/", {"q": "Dep"}).json()
+        self.assertEqual([tag["name"] for tag in data["tags"]], ["deployment"])
+
+    def test_short_queries_return_nothing(self):
+        with self.assertNumQueries(0):
+            data = self.client.get("/blog/search/suggest/", {"q": "d"}).json()
+        self.assertEqual(data["posts"], [])
+
+
+class PostUrlTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Late night post",
+            slug="late-night-post",
+            author=author,
+            body="Published just before midnight.",
+            status=Post.Status.PUBLISH,
+            publish=datetime(2025, 3, 9, 23, 59, 59, tzinfo=dt_timezone.utc),
+        )
+
+    def test_canonical_path_is_stored(self):
+        self.assertEqual(self.post.url_path, "/blog/2025/3/9/late-night-post/")
+        self.post.slug = "renamed"
+        self.post.save(update_fields=["slug"])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.get_absolute_url(), "/blog/2025/3/9/renamed/")
+
+    def test_detail_uses_a_day_range(self):
+        response = self.client.get("/blog/2025/3/9/late-night-post/")
+        self.assertEqual(response.status_code, 200)
+        for url in (
+            "/blog/2025/3/10/late-night-post/",
+            "/blog/2025/2/30/late-night-post/",
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_lists_reverse_no_urls(self):
+        with patch("blog_1.models.reverse") as reverse:
+            self.assertContains(self.client.get("/blog/"), self.post.url_path)
+            self.assertContains(self.client.get("/blog/feed/"), self.post.url_path)
+        reverse.assert_not_called()
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Cached post",
+            slug="cached-post",
+            author=self.author,
+            body="Served from the page cache.",
+            status=Post.Status.PUBLISH,
+        )
+        self.post.tags.add("caching")
+        self.url = self.post.get_absolute_url()
+
+    def test_anonymous_pages_are_cached(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        # Only the dependency generations are read (from the shared cache)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+        self.assertFalse([q for q in queries if "blog_1_" in q["sql"]])
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        # Same page apart from the (per-response masked) CSRF token
+        token = re.compile(rb'csrfmiddlewaretoken" value="[^"]+"')
+        self.assertEqual(token.sub(b"", second.content), token.sub(b"", first.content))
+        self.assertContains(second, "Latest posts")
+        self.assertEqual(self.client.get("/blog/")["X-Page-Cache"], "miss")
+        self.assertEqual(self.client.get("/blog/")["X-Page-Cache"], "hit")
+
+    def test_cached_form_gets_a_fresh_csrf_token(self):
+        self.client.get(self.url)
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(self.url)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertNotContains(response, "page-cache-csrf-token")
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()
+        )[1]
+        response = client.post(
+            f"/blog/{self.post.id}/comment/",
+            {
+                "name": "Reader",
+                "email": "reader@example.com",
+                "body": "Hi",
+                "csrfmiddlewaretoken": token,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate_affected_pages(self):
+        other = Post.objects.create(
+            title="Other post",
+            slug="other-post",
+            author=self.author,
+            body="Not tagged.",
+            status=Post.Status.PUBLISH,
+        )
+        for url in (self.url, other.get_absolute_url(), "/blog/tag/caching/"):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, name="Reader", email="reader@example.com", body="Hi"
+            )
+        self.assertContains(self.client.get(self.url), "1 comment")
+        self.assertEqual(
+            self.client.get(other.get_absolute_url())["X-Page-Cache"], "hit"
+        )
+        self.assertEqual(self.client.get("/blog/tag/caching/")["X-Page-Cache"], "hit")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "Renamed post"
+            self.post.save()
+        self.assertContains(self.client.get("/blog/tag/caching/"), "Renamed post")
+        self.assertContains(self.client.get(self.url), "Renamed post")
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.login(username="author", password="password")
+        response = self.client.get(self.url)
+        self.assertNotIn("X-Page-Cache", response)
+
+
+class HttpCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(
+            title="Validated post",
+            slug="validated-post",
+            author=self.author,
+            body="Revalidate me.",
+            status=Post.Status.PUBLISH,
+        )
+        self.post.tags.add("http")
+
+    def test_unchanged_pages_get_304_before_rendering(self):
+        for url in ("/blog/", "/blog/feed/", "/sitemap.xml"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("public", response["Cache-Control"])
+            self.assertEqual(response["X-Accel-Expires"], "300")
+            with CaptureQueriesContext(connection) as queries:
+                again = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=response["ETag"],
+                    HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+                )
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again["ETag"], response["ETag"])
+            self.assertFalse([q for q in queries if "blog_1_" in q["sql"]])
+
+    def test_changes_move_the_validators(self):
+        etag = self.client.get("/blog/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, name="Reader", email="reader@example.com", body="Hi"
+            )
+        changed = self.client.get("/blog/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add("caching")
+        self.assertEqual(
+            self.client.get("/blog/", HTTP_IF_NONE_MATCH=changed["ETag"]).status_code,
+            200,
+        )
+
+    def test_detail_and_logged_in_pages_are_private(self):
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("X-Accel-Expires", response)
+        anonymous = self.client.get("/blog/")
+        self.client.login(username="author", password="password")
+        response = self.client.get("/blog/", HTTP_IF_NONE_MATCH=anonymous["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+    @override_settings(PAGE_PURGE_URL="http://proxy/purge")
+    def test_publishing_purges_the_proxy(self):
+        draft = Post.objects.create(
+            title="Draft",
+            slug="draft",
+            author=self.author,
+            body="Soon.",
+        )
+        with patch("blog_1.http_cache.urllib.request.urlopen") as urlopen:
+            with self.captureOnCommitCallbacks(execute=True):
+                draft.body = "Still a draft."
+                draft.save()
+            urlopen.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                draft.status = Post.Status.PUBLISH
+                draft.save()
+        requests = [call.args[0] for call in urlopen.call_args_list]
+        self.assertEqual({request.method for request in requests}, {"PURGE"})
+        self.assertEqual(
+            [request.full_url for request in requests],
+            [
+                "http://proxy/purge/blog/",
+                "http://proxy/purge/blog/feed/",
+                "http://proxy/purge/blog/feed/atom/",
+                "http://proxy/purge/sitemap.xml",
+                f"http://proxy/purge/sitemap-{sitemaps.section_of(draft.publish)}.xml",
+            ],
+        )
+
+
+class StaticExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        author = User.objects.create_user(username="author", password="password")
+        self.posts = [
+            Post.objects.create(
+                title=f"Exported {i}",
+                slug=f"exported-{i}",
+                author=author,
+                body="Static.",
+                status=Post.Status.PUBLISH,
+                publish=datetime(2025, 1, 1 + i, tzinfo=dt_timezone.utc),
+            )
+            for i in range(4)
+        ]
+        self.posts[0].tags.add("static")
+
+    def export(self):
+        rendered, removed, failed = export.export(self.directory)
+        self.assertEqual(failed, {})
+        return sorted(rendered), sorted(removed)
+
+    def test_export_writes_every_page(self):
+        rendered, removed = self.export()
+        self.assertEqual(len(rendered), 4 + 3 + 2 + 4 + 1)
+        for name in (
+            "blog/index.html",
+            "blog/index1.html",
+            "blog/index2.html",
+            "blog/tag/static/index.html",
+            "blog/feed/index.xml",
+            "blog/feed/atom/index.xml",
+            "blog/tag/static/feed/index.xml",
+            "sitemap.xml",
+            "_sidebar.html",
+        ):
+            self.assertTrue((self.directory / name).exists(), name)
+        page = (self.directory / "blog/2025/1/1/exported-0/index.html").read_text()
+        self.assertIn("<h1>Exported 0</h1>", page)
+        self.assertIn('<!--# include virtual="/_sidebar.html" -->', page)
+        self.assertIn('value="<!--# include virtual="/blog/csrf-token/" -->"', page)
+        self.assertIn("Exported 3", (self.directory / "blog/index.html").read_text())
+        self.assertEqual(self.export(), ([], []))
+
+    def test_only_changed_pages_are_rerendered(self):
+        self.export()
+        Comment.objects.create(
+            post=self.posts[0], name="Reader", email="reader@example.com", body="Hi"
+        )
+        self.assertEqual(self.export(), (["/blog/2025/1/1/exported-0/"], []))
+        self.assertIn(
+            "1 comment",
+            (self.directory / "blog/2025/1/1/exported-0/index.html").read_text(),
+        )
+
+        self.posts[1].status = Post.Status.DRAFT
+        self.posts[1].save()
+        rendered, removed = self.export()
+        self.assertEqual(removed, ["/blog/2025/1/2/exported-1/", "/blog/?page=2"])
+        self.assertIn("/blog/feed/", rendered)
+        self.assertNotIn("/blog/tag/static/", rendered)
+        self.assertFalse(
+            (self.directory / "blog/2025/1/2/exported-1/index.html").exists()
+        )
+        self.assertFalse((self.directory / "blog/index2.html").exists())
+
+    def test_csrf_token_matches_the_cookie(self):
+        client = Client(enforce_csrf_checks=True)
+        token = client.get("/blog/csrf-token/").content.decode()
+        response = client.post(
+            f"/blog/{self.posts[0].id}/comment/",
+            {
+                "name": "Reader",
+                "email": "reader@example.com",
+                "body": "Hi",
+                "csrfmiddlewaretoken": token,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ParallelExportTests(TransactionTestCase):
+    serialized_rollback = True
+
+    def test_process_pool_renders_the_same_pages(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        author = User.objects.create_user(username="author", password="password")
+        for i in range(5):
+            Post.objects.create(
+                title=f"Parallel {i}",
+                slug=f"parallel-{i}",
+                author=author,
+                body="Rendered elsewhere.",
+                status=Post.Status.PUBLISH,
+            )
+        rendered, removed, failed = export.export(directory, workers=2)
+        self.assertEqual((len(rendered), removed, failed), (5 + 3 + 3, [], {}))
+        self.assertEqual(len(list(directory.glob("blog/*/*/*/*/index.html"))), 5)
+
+
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.posts = [
+            self.create_post(
+                f"march-{day}", datetime(2025, 3, day, tzinfo=dt_timezone.utc)
+            )
+            for day in (1, 2, 3)
+        ] + [self.create_post("april", datetime(2025, 4, 1, tzinfo=dt_timezone.utc))]
+        self.posts[0].tags.add("maps")
+
+    def create_post(self, slug, publish):
+        return Post.objects.create(
+            title=slug,
+            slug=slug,
+            author=self.author,
+            body="Find me.",
+            status=Post.Status.PUBLISH,
+            publish=publish,
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return b"".join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def blog_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        return [q for q in queries if "blog_1_" in q["sql"]]
+
+    def test_index_lists_monthly_sections(self):
+        index = self.get("/sitemap.xml")
+        sections = re.findall(
+            r"<loc>http://example.com/sitemap-([\w-]+)\.xml</loc>", index
+        )
+        self.assertEqual(sections, ["posts-2025-03", "posts-2025-04", "tags"])
+        march = self.get("/sitemap-posts-2025-03.xml")
+        self.assertEqual(
+            re.findall(r"<loc>http://example.com(.*?)</loc>", march),
+            [post.url_path for post in self.posts[:3]],
+        )
+        self.assertIn("/blog/tag/maps/", self.get("/sitemap-tags.xml"))
+        self.assertEqual(self.client.get("/sitemap-posts-2025-13.xml").status_code, 404)
+        self.assertEqual(self.client.get("/sitemap-nope.xml").status_code, 404)
+
+    def test_busy_months_are_split(self):
+        with patch("blog_1.sitemaps.SITEMAP_LIMIT", 2):
+            index = self.get("/sitemap.xml")
+            self.assertIn("sitemap-posts-2025-03-2.xml", index)
+            second = self.get("/sitemap-posts-2025-03-2.xml")
+        self.assertEqual(
+            re.findall(r"<loc>http://example.com(.*?)</loc>", second),
+            [self.posts[2].url_path],
+        )
+
+    def test_sections_are_cached_until_a_post_in_them_changes(self):
+        for url in ("/sitemap-posts-2025-03.xml", "/sitemap-posts-2025-04.xml"):
+            self.get(url)
+            self.assertFalse(self.blog_queries(url))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[3].publish = datetime(2025, 3, 4, tzinfo=dt_timezone.utc)
+            self.posts[3].save()
+        self.assertIn(self.posts[3].url_path, self.get("/sitemap-posts-2025-03.xml"))
+        self.assertNotIn("<loc>", self.get("/sitemap-posts-2025-04.xml"))
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.tagged = self.create_post("tagged")
+        self.tagged.tags.add("feeds")
+        self.create_post("untagged")
+
+    def create_post(self, slug):
+        return Post.objects.create(
+            title=slug.title(),
+            slug=slug,
+            author=self.author,
+            body=f"The {slug} post.",
+            status=Post.Status.PUBLISH,
+        )
+
+    def test_tag_feeds(self):
+        rss = self.client.get("/blog/tag/feeds/feed/")
+        self.assertContains(rss, "<title>Tagged</title>")
+        self.assertNotContains(rss, "Untagged")
+        atom = self.client.get("/blog/tag/feeds/feed/atom/")
+        self.assertContains(atom, 'xmlns="http://www.w3.org/2005/Atom"')
+        self.assertContains(atom, "<title>Tagged</title>")
+        self.assertNotContains(atom, "Untagged")
+        self.assertContains(self.client.get("/blog/feed/atom/"), "Untagged")
+        self.assertEqual(self.client.get("/blog/tag/nope/feed/").status_code, 404)
+
+    def test_feeds_are_cached_until_a_post_changes(self):
+        first = self.client.get("/blog/tag/feeds/feed/")
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get("/blog/tag/feeds/feed/")
+        self.assertFalse([q for q in queries if "blog_1_" in q["sql"]])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(
+            self.client.get(
+                "/blog/tag/feeds/feed/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+            ).status_code,
+            304,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post("newer").tags.add("feeds")
+        response = self.client.get(
+            "/blog/tag/feeds/feed/", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertContains(response, "<title>Newer</title>")
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        if server.unavailable:
+            self.reply("421 Try again later")
+            return
+        self.reply("220 localhost SMTP stand-in")
+        sender, recipients = None, []
+        for line in self.rfile:
+            command = line.decode().rstrip("\r\n")
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip("<> "), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip("<> ")
+                if address in server.refused:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for line in self.rfile:
+                    if line == b".\r\n":
+                        break
+                    data.append(line.decode())
+                server.messages.append((sender, recipients, "".join(data)))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """A local SMTP server that records what it receives"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+        self.messages = []
+        self.connections = 0
+        self.refused = set()
+        self.unavailable = False
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_TIMEOUT=5,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def send_queued_mail(self):
+        out = StringIO()
+        call_command("send_queued_mail", once=True, stdout=out)
+        return out.getvalue().strip()
+
+    def test_sharing_only_queues_the_email(self):
+        author = User.objects.create_user(username="author", password="password")
+        post = Post.objects.create(
+            title="Shared post",
+            slug="shared-post",
+            author=author,
+            body="Tell a friend.",
+            status=Post.Status.PUBLISH,
+        )
+        response = self.client.post(
+            f"/blog/{post.id}/share/",
+            {
+                "name": "Reader",
+                "email": "reader@example.com",
+                "to": "friend@example.com",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.smtp.connections, 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipients, ["friend@example.com"])
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+
+        self.assertEqual(self.send_queued_mail(), "Sent 1, retrying 0, failed 0")
+        sender, recipients, data = self.smtp.messages[0]
+        self.assertEqual(recipients, ["friend@example.com"])
+        self.assertIn("Reader recommends you read Shared post", data)
+
+    def test_batches_share_one_connection(self):
+        for i in range(5):
+            mail.enqueue(f"Message {i}", "Hello", [f"reader{i}@example.com"])
+        with patch("blog_1.mail.BATCH_SIZE", 2):
+            self.assertEqual(self.send_queued_mail(), "Sent 5, retrying 0, failed 0")
+        self.assertEqual(len(self.smtp.messages), 5)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.Status.SENT).exists()
+        )
+        self.assertEqual(self.send_queued_mail(), "Sent 0, retrying 0, failed 0")
+
+    def test_failures_are_retried_with_backoff(self):
+        refused = mail.enqueue("Refused", "Hello", ["nobody@example.com"])
+        later = mail.enqueue("Later", "Hello", ["reader@example.com"])
+        self.smtp.refused.add("nobody@example.com")
+        self.smtp.unavailable = True
+        with self.assertLogs("blog_1.mail", "WARNING"):
+            self.assertEqual(self.send_queued_mail(), "Sent 0, retrying 2, failed 0")
+        later.refresh_from_db()
+        self.assertEqual(later.attempts, 1)
+        self.assertGreater(
+            later.next_attempt_at, timezone.now() + timedelta(seconds=50)
+        )
+        self.assertIn("SMTPConnectError", later.last_error)
+        # Not due yet
+        self.assertEqual(self.send_queued_mail(), "Sent 0, retrying 0, failed 0")
+
+        self.smtp.unavailable = False
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs("blog_1.mail", "ERROR"):
+            self.assertEqual(self.send_queued_mail(), "Sent 1, retrying 0, failed 1")
+        refused.refresh_from_db()
+        self.assertEqual(refused.status, OutgoingEmail.Status.FAILED)
+        self.assertIn("550", refused.last_error)
+        self.assertEqual(
+            [message[1] for message in self.smtp.messages], [["reader@example.com"]]
+        )
+
+    def test_retry_delay_backs_off_exponentially(self):
+        delays = [mail.retry_delay(attempts).total_seconds() for attempts in (1, 2, 3)]
+        for delay, base in zip(delays, (60, 120, 240)):
+            self.assertTrue(base <= delay <= base * 1.1)
+        self.assertLessEqual(mail.retry_delay(30).total_seconds(), 6 * 3600 * 1.1)
@@ -1,20 +1,34 @@
-from django.urls import path
-
-from . import views
-from .feeds import LatestPostsFeed
-
-app_name = "blog_1"
-urlpatterns = [
-    path("", views.post_lists, name="post_lists"),
-    # path('', views.PostListView.as_view(), name='post_list'),
-    path("tag/<slug:tag_slug>/", views.post_lists, name="post_list_by_tag"),
-    path(
-        "<int:year>/<int:month>/<int:day>/<slug:post>/",
-        views.post_detail,
-        name="post_detail",
-    ),
-    path("<int:post_id>/share/", views.post_share, name="post_share"),
-    path("<int:post_id>/comment/", views.post_comment, name="post_comment"),
-    path('feed/',LatestPostsFeed(),name= 'post_feed'),
-    path('search/', views.post_search, name='post_search'),
-]
+from django.urls import path
+
+from . import views
+from .feeds import LatestPostsAtomFeed, LatestPostsFeed, TagPostsAtomFeed, TagPostsFeed
+from .http_cache import http_cache
+
+app_name = "blog_1"
+urlpatterns = [
+    path("", views.post_lists, name="post_lists"),
+    # path('', views.PostListView.as_view(), name='post_list'),
+    path("tag/<slug:tag_slug>/", views.post_lists, name="post_list_by_tag"),
+    path(
+        "<int:year>/<int:month>/<int:day>/<slug:post>/",
+        views.post_detail,
+        name="post_detail",
+    ),
+    path("<int:post_id>/share/", views.post_share, name="post_share"),
+    path("<int:post_id>/comment/", views.post_comment, name="post_comment"),
+    path("feed/", http_cache()(LatestPostsFeed()), name="post_feed"),
+    path("feed/atom/", http_cache()(LatestPostsAtomFeed()), name="post_atom_feed"),
+    path(
+        "tag/<slug:tag_slug>/feed/",
+        http_cache()(TagPostsFeed()),
+        name="tag_feed",
+    ),
+    path(
+        "tag/<slug:tag_slug>/feed/atom/",
+        http_cache()(TagPostsAtomFeed()),
+        name="tag_atom_feed",
+    ),
+    path('search/', views.post_search, name='post_search'),
+    path("search/suggest/", views.post_suggest, name="post_suggest"),
+    path("csrf-token/", views.csrf_token, name="csrf_token"),
+]
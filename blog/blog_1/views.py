@@ -3,26 +3,37 @@ from django.views.generic import ListView
 
 from .models import Post
 from .forms import EmailPostForm, CommentForm, SearchForm
-from django.core.mail import send_mail
 
-from django.views.decorators.http import require_POST
-from django.db.models import Count
+from datetime import datetime, timedelta
 
+from django.http import Http404, HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import require_GET, require_POST
 
 # --- Function-based view (same behaviour – for comparison while learning) ---
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from taggit.models import Tag
-from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
 
+from . import mail, search
+from .caching import LISTING, cache_anonymous_page, depend_on
+from .http_cache import http_cache
 
+POSTS_PER_PAGE = 3
+
+
+@http_cache()
+@cache_anonymous_page
 def post_lists(request, tag_slug=None):
+    depend_on(request, f"tag:{tag_slug}" if tag_slug else LISTING)
     post_list = Post.published.all()
     tag = None
     if tag_slug:
         tag = get_object_or_404(Tag, slug=tag_slug)
         post_list = post_list.filter(tags__in=[tag])
-    paginator = Paginator(post_list, 3)
+    paginator = Paginator(post_list, POSTS_PER_PAGE)
     page_number = request.GET.get("page", 1)
     try:
         posts = paginator.page(page_number)
@@ -51,28 +62,37 @@ class PostListView(ListView):
     template_name = "blog/post/post_list.html"
 
 
+# Private: the comment form carries the visitor's CSRF token
+@http_cache(public=False)
+@cache_anonymous_page
 def post_detail(request, year, month, day, post):
     # try:
     #     post = Post.published.get(id=id)
     # except Post.DoesNotExist:
     #     raise Http404("Post does not exist")
+    # A half-open range on publish (rather than __year/__month/__day) can
+    # use the (slug, publish) index
+    try:
+        day_start = timezone.make_aware(datetime(year, month, day))
+    except ValueError:
+        raise Http404("No such date")
     post = get_object_or_404(
         Post,
         status=Post.Status.PUBLISH,
         slug=post,
-        publish__year=year,
-        publish__month=month,
-        publish__day=day,
+        publish__gte=day_start,
+        publish__lt=day_start + timedelta(days=1),
     )
+    depend_on(request, f"post:{post.pk}")
     comments = post.comments.filter(active=True)
     form = CommentForm()
-    post_tags_ids = post.tags.values_list("id", flat=True)
-    similar_posts = Post.published.filter(tags__in=post_tags_ids).exclude(id=post.id)
-
-    # Find similar posts: annotate with number of shared tags and order by that, then by publish date
-    similar_posts = similar_posts.annotate(same_tags=Count("tags")).order_by(
-        "-same_tags", "-publish"
-    )[:4]
+    # Precomputed when tags or statuses change (see similarity.py)
+    similar_posts = [
+        row.similar
+        for row in post.similar_posts.select_related("similar").only(
+            "post", "similar__title", "similar__url_path"
+        )
+    ]
     return render(
         request,
         "blog/post/post_detail.html",
@@ -103,10 +123,10 @@ def post_share(request, post_id):
                 f"Read {post.title} at {post_url}\n\n"
                 f"{cd['name']}'s comments: {cd['comments']}"
             )
-            send_mail(
+            # Sent by the mail worker (see mail.py), not while the visitor waits
+            mail.enqueue(
                 subject=subject,
                 message=message,
-                from_email=None,
                 recipient_list=[cd["to"]],
             )
             sent = True
@@ -138,22 +158,32 @@ def post_comment(request, post_id):
 def post_search(request):
     form = SearchForm()
     query = None
-    results = []
+    results = None
     if "query" in request.GET:
         form = SearchForm(request.GET)
         if form.is_valid():
             query = form.cleaned_data["query"]
-            search_vector = SearchVector("title", "body")
-            search_query = SearchQuery(query)
-            results = (
-                Post.published.annotate(
-                    search=search_vector, rank=SearchRank(search_vector, search_query)
-                )
-                .filter(search=search_query)
-                .order_by("-rank")
-            )
+            paginator = Paginator(search.search(query), search.RESULTS_PER_PAGE)
+            results = paginator.get_page(request.GET.get("page"))
+            # Headlines only for the posts on this page
+            results.object_list = search.add_headlines(list(results.object_list), query)
     return render(
         request,
         "blog/post/search.html",
         {"form": form, "query": query, "results": results},
     )
+
+
+@require_GET
+@cache_control(public=True, max_age=60)
+def post_suggest(request):
+    """Search-as-you-type: JSON post titles and tags matching the prefix in ?q="""
+    query = request.GET.get("q", "")
+    return JsonResponse({"query": query, **search.suggest(query)})
+
+
+@require_GET
+@never_cache
+def csrf_token(request):
+    """The visitor's CSRF token, included into statically exported post pages"""
+    return HttpResponse(get_token(request), content_type="text/plain")
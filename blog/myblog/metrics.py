@@ -0,0 +1,158 @@
+"""
+Prometheus metrics for the blog, scraped from ``GET /metrics``.
+
+MetricsMiddleware records, per view (``post_detail``, ``post_search``, ...):
+request count and latency, database queries and query time, response size
+and requests in flight. Cache hits, misses, stale hits and recomputations
+are counted by the cache backend (myblog/cache.py).
+
+Recording only updates in-process values. When serving with several
+worker processes, export ``PROMETHEUS_MULTIPROC_DIR`` pointing at an empty
+directory before starting the server: every worker then writes its samples to its
+own memory-mapped file there, and the scrape merges all of them, so the
+numbers cover the whole server rather than whichever worker answered.
+"""
+
+import os
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS = Counter(
+    "django_http_requests_total",
+    "Requests by view, method and status",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "django_http_request_duration_seconds",
+    "Request latency by view",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "django_http_response_size_bytes",
+    "Response body size by view",
+    ["view"],
+    buckets=SIZE_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "django_http_requests_in_flight",
+    "Requests currently being served",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Histogram(
+    "django_db_queries_per_request",
+    "Database queries per request by view",
+    ["view"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_TIME = Histogram(
+    "django_db_query_duration_seconds",
+    "Time spent in database queries per request by view",
+    ["view"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "django_cache_requests_total",
+    "Cache lookups by result (hit or miss)",
+    ["result"],
+)
+CACHE_STALE_HITS = Counter(
+    "django_cache_stale_hits_total",
+    "Stale values served while another process recomputed them",
+)
+CACHE_RECOMPUTATIONS = Counter(
+    "django_cache_recomputations_total",
+    "Values recomputed by get_or_compute()",
+)
+
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+def view_name(view_func):
+    """
+    Short metric label for a view: the view function or class name
+    (``post_detail``, ``PostListView``, ``LatestPostsFeed``)
+    """
+    cls = getattr(view_func, "view_class", None)
+    if cls is not None:
+        return cls.__name__
+    # Callable instances (e.g. syndication feeds) are named after their class
+    return getattr(view_func, "__name__", type(view_func).__name__)
+
+
+class QueryCounter:
+    """execute_wrapper that counts queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records per-view request metrics
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.metrics_view = UNRESOLVED_VIEW
+        queries = QueryCounter()
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        duration = time.perf_counter() - start
+
+        view = request.metrics_view
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        LATENCY.labels(view, request.method).observe(duration)
+        DB_QUERIES.labels(view).observe(queries.count)
+        DB_QUERY_TIME.labels(view).observe(queries.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(view).observe(len(response.content))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(view_func)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of all metrics (merged across workers)."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
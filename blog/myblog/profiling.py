@@ -0,0 +1,161 @@
+"""
+On-demand profiling of individual requests.
+
+A request is profiled when it carries ``X-Profile: <PROFILING_TOKEN>`` or
+is picked by PROFILING_SAMPLE_RATE (a fraction of all requests). A
+background thread samples the request thread's Python stack every
+PROFILING_INTERVAL seconds; the counts are written to PROFILING_DIR as
+``<time>-<view>-<request id>.folded`` (collapsed stacks, one
+``frame;frame;frame count`` line per stack, readable by flamegraph.pl and
+speedscope) next to a ``.json`` file with the request's details. The
+response carries the profile's name in ``X-Profile-Id``.
+
+Unless PROFILING_TOKEN or PROFILING_SAMPLE_RATE is configured the
+middleware raises MiddlewareNotUsed and is left out of the stack entirely.
+Captured profiles are listed and summarized by ``manage.py profiles``.
+"""
+
+import hmac
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import UNRESOLVED_VIEW, view_name
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+REQUEST_ID_HEADER = "HTTP_X_REQUEST_ID"
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread from a background thread
+    """
+
+    def __init__(self, thread_id, root_frame, interval):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # Walk up to the middleware's own frame; server frames are noise
+            while frame is not None and frame is not self.root_frame:
+                stack.append(
+                    f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def profile_path(view, request_id):
+    """Base path (no suffix) for a new profile of ``view``."""
+    safe_view = re.sub(r"[^A-Za-z0-9_.-]+", "_", view)
+    safe_id = re.sub(r"[^A-Za-z0-9_-]+", "_", request_id)[:64]
+    return Path(
+        settings.PROFILING_DIR,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_view}-{safe_id}",
+    )
+
+
+def load_profiles():
+    """Metadata of every captured profile, newest first."""
+    profiles = []
+    for meta_path in Path(settings.PROFILING_DIR).glob("*.json"):
+        with open(meta_path) as f:
+            profiles.append({**json.load(f), "name": meta_path.stem})
+    return sorted(profiles, key=lambda profile: profile["started_at"], reverse=True)
+
+
+def read_stacks(name):
+    """{folded stack: samples} of a captured profile."""
+    stacks = Counter()
+    with open(Path(settings.PROFILING_DIR, f"{name}.folded")) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            stacks[stack] += int(count)
+    return stacks
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that ask for it (X-Profile token) or are sampled
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_TOKEN and not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        token = request.META.get(PROFILE_HEADER)
+        if token and settings.PROFILING_TOKEN:
+            return hmac.compare_digest(token, settings.PROFILING_TOKEN)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        request.profiling_view = UNRESOLVED_VIEW
+        started_at = time.time()
+        start = time.perf_counter()
+        with StackSampler(
+            threading.get_ident(), sys._getframe(), settings.PROFILING_INTERVAL
+        ) as sampler:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        request_id = request.META.get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:12]
+        path = profile_path(request.profiling_view, request_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # View names contain dots, so append suffixes rather than with_suffix()
+        with open(f"{path}.folded", "w") as f:
+            for stack, count in sampler.stacks.items():
+                f.write(f"{stack} {count}\n")
+        with open(f"{path}.json", "w") as f:
+            json.dump(
+                {
+                    "view": request.profiling_view,
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "status": response.status_code,
+                    "request_id": request_id,
+                    "started_at": started_at,
+                    "duration": duration,
+                    "interval": settings.PROFILING_INTERVAL,
+                    "samples": sum(sampler.stacks.values()),
+                },
+                f,
+                indent=2,
+            )
+        response["X-Profile-Id"] = path.name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, "profiling_view"):
+            request.profiling_view = view_name(view_func)
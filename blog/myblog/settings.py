@@ -38,7 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    'django.contrib.postgres',  # For PostgreSQL-specific features (e.g., full-text search, JSONField)
+    "django.contrib.postgres",  # For PostgreSQL-specific features (e.g., full-text search, JSONField)
     "taggit",
     "django.contrib.sites",
     "django.contrib.sitemaps",
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "myblog.metrics.MetricsMiddleware",  # Prometheus metrics, scraped from /metrics
+    "myblog.profiling.ProfilingMiddleware",  # On-demand request profiles
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -121,10 +123,78 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Two-level cache (see myblog/cache.py): a per-process LRU in front of a
+# cache shared by all workers, Redis when REDIS_URL is set and otherwise the
+# database cache table (python manage.py createcachetable).
+if config("REDIS_URL", default=""):
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL"),
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "myblog.cache.TieredCache",
+        "LOCATION": "default",
+        "OPTIONS": {
+            "SHARED": "shared",
+            "LOCAL_MAX_ENTRIES": 1000,
+            "LOCAL_TIMEOUT": 5,
+            "JITTER": 0.1,
+            "STALE_TIMEOUT": 60,
+            "LOCK_TIMEOUT": 10,
+        },
+    },
+    "shared": SHARED_CACHE,
+    # Per-process cache of hot search suggestion prefixes (blog_1/search.py)
+    "suggestions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "suggestions",
+        "TIMEOUT": 60,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# nginx cache purge endpoint (see blog_1/http_cache.py and nginx/nginx.conf),
+# e.g. "http://127.0.0.1/purge"; published posts aren't purged when empty.
+PAGE_PURGE_URL = config("PAGE_PURGE_URL", default="")
+
+
+# On-demand request profiling (see myblog/profiling.py): requests sent with
+# "X-Profile: <PROFILING_TOKEN>", plus PROFILING_SAMPLE_RATE of all requests,
+# are profiled into PROFILING_DIR. Disabled when neither is set.
+PROFILING_DIR = config("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_TOKEN = config("PROFILING_TOKEN", default="")
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+PROFILING_INTERVAL = 0.005
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# python manage.py export_static writes the published blog here for nginx
+# to serve (see blog_1/export.py).
+STATIC_EXPORT_DIR = config("STATIC_EXPORT_DIR", default=str(BASE_DIR / "export"))
+
+# collectstatic writes hashed names (blog.<hash>.css) and .gz/.br copies so a
+# front-end server can serve STATIC_ROOT directly with far-future caching;
+# see nginx/nginx.conf.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "myblog.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -136,12 +206,16 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # For local dev, set that site's domain to 127.0.0.1:8000 in Admin > Sites, or run the command below.
 SITE_ID = 1
 
-# Email server configuration (Gmail SMTP)
-EMAIL_HOST = "smtp.gmail.com"
+# Email server configuration (Gmail SMTP by default). Mail is queued and sent
+# by python manage.py send_queued_mail (see blog_1/mail.py); point EMAIL_HOST
+# and EMAIL_PORT at a local SMTP server to try it out.
+EMAIL_HOST = config("EMAIL_HOST", default="smtp.gmail.com")
 EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_PORT = config("EMAIL_PORT", default=587, cast=int)
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=True, cast=bool)
+# Only the mail worker waits on the server; don't let it hang forever
+EMAIL_TIMEOUT = 30
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
 # Use SMTP to send real emails. For local testing without sending, use:
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -0,0 +1,62 @@
+"""
+Static files storage for collectstatic: content-hashed names (so
+``blog.css`` becomes ``blog.<hash>.css`` and can be cached forever) plus
+precompressed ``.gz``/``.br`` copies for nginx's ``gzip_static`` and
+``brotli_static``.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # no .br copies without the brotli package
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".html", ".xml", ".ico", ".ttf", ".eot",
+)
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def url(self, name, force=False):
+        # Serve hashed names as soon as a manifest exists, DEBUG or not.
+        return super().url(name, force=force or bool(self.hashed_files))
+
+    def stored_name(self, name):
+        # Plain names until collectstatic has been run (development, tests).
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        """Write compressed siblings of a collected file when they save space."""
+        path = self.path(name)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            content = f.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+        for suffix, encode in encoders:
+            target = path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            compressed = encode(content)
+            if len(compressed) < len(content):
+                with open(target, "wb") as f:
+                    f.write(compressed)
@@ -17,19 +17,18 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from django.contrib.sitemaps.views import sitemap
-from blog_1.sitemaps import PostSitemap
+from blog_1.http_cache import http_cache
+from blog_1.sitemaps import sitemap_index, sitemap_section
+from myblog.metrics import metrics_view
 
-sitemaps = {
-    "posts": PostSitemap,
-}
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("blog/", include("blog_1.urls", namespace="blog_1")),
+    path("sitemap.xml", http_cache()(sitemap_index), name="sitemap"),
     path(
-        "sitemap.xml",
-        sitemap,
-        {"sitemaps": sitemaps},
-        name="django.contrib.sitemaps.views.sitemap",
+        "sitemap-<slug:section>.xml",
+        http_cache()(sitemap_section),
+        name="sitemap_section",
     ),
+    path("metrics", metrics_view, name="metrics"),
 ]